@@ -2,10 +2,18 @@ from flask import Flask
 from flask_socketio import SocketIO
 from config import Config
 from dotenv import load_dotenv
-from utils.docker import start_health_check_thread
+from utils.expiry import start_expiry_thread
+from utils.logger import start_audit_writer
+from utils.counters import start_counters_thread
+from utils.warm_pool import start_warm_pool_thread
+from utils.reconciler import start_reconciler_thread
+from utils.nodes import init_nodes
+from utils.images import start_image_manager_thread
+from utils.jobs import init_creation_jobs
 
 # -------- DB ---------
-from models import init_db
+from models import init_db, is_migration_command, schema_ready
+from models.quota import initialize_quotas
 
 # -------- Blueprints ---------
 from blueprints.main import main_bp
@@ -17,6 +25,7 @@ from blueprints.logs import logs_bp
 # -------- Sockets ---------
 from sockets.container_logs import ContainerLogsNamespace
 from sockets.container_terminal import ContainerTerminalNamespace
+from sockets.container_jobs import ContainerJobsNamespace
 
 load_dotenv()
 
@@ -41,9 +50,26 @@ app.register_blueprint(logs_bp)
 # Register socket namespaces
 socketio.on_namespace(ContainerLogsNamespace('/container_logs'))
 socketio.on_namespace(ContainerTerminalNamespace('/container_terminal'))
+socketio.on_namespace(ContainerJobsNamespace('/container_jobs'))
 
 # Initialize
-start_health_check_thread(app)
+def init_services(app):
+    """依赖最新表结构的启动步骤，flask db 命令和未迁移的数据库上不执行"""
+    with app.app_context():
+        if not schema_ready():
+            return
+        initialize_quotas()
+    start_audit_writer(app)
+    init_nodes(app)
+    init_creation_jobs(app)
+    start_reconciler_thread(app)
+    start_expiry_thread(app)
+    start_image_manager_thread(app)
+    start_warm_pool_thread(app)
+    start_counters_thread(app)
+
+if not is_migration_command():
+    init_services(app)
 
 if __name__ == '__main__':
     socketio.run(app, debug=True)
\ No newline at end of file
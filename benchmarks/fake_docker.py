@@ -0,0 +1,857 @@
+"""模拟 Docker Engine API 的本地服务，用于压测时代替真实的 Docker 节点
+
+    python benchmarks/fake_docker.py --port 2375 --latency create=0.2,start=0.1,default=0.002
+
+然后把应用的 DOCKER_NODES 指向它，例如 DOCKER_NODES="fake|tcp://127.0.0.1:2375|127.0.0.1"。
+
+实现了 docker-py 用到的接口：容器的创建/启动/停止/删除/重命名/查看/列表、
+stats 和 logs 流、exec（带 tty 的 hijack 连接）、events 流以及镜像的拉取/查看/删除。
+容器不会真正运行：日志按固定速率生成，stats 返回随机的资源占用，
+exec 里的 yes 会持续输出，其他命令把输入原样回显（sh/bash 额外输出提示符）。
+"""
+import argparse
+import json
+import queue
+import random
+import re
+import select
+import shlex
+import socket
+import struct
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+API_VERSION = '1.43'
+DEFAULT_LATENCY = 0.001
+# 每个容器每秒输出的日志行数、stats 推送间隔
+LOG_RATE = 2
+STATS_INTERVAL = 1
+# 事件重放保留的条数
+EVENT_HISTORY = 1000
+# exec 升级连接后到进程产生第一个输出的时间。
+# 紧跟在 101 响应后的数据会被 http.client 读进缓冲区，直接读 socket 的一方就收不到了
+EXEC_STARTUP = 0.05
+
+def parse_latencies(spec):
+    """"create=0.2,start=0.1,default=0.002" -> {操作: 秒}"""
+    latencies = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            op, _, value = item.partition('=')
+            latencies[op.strip()] = float(value)
+    return latencies
+
+def normalize_image(name):
+    """没有标签的镜像名补上 :latest"""
+    if ':' not in name.rsplit('/', 1)[-1] and '@' not in name:
+        return name + ':latest'
+    return name
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+class FakeContainer:
+    def __init__(self, name, config):
+        self.id = uuid.uuid4().hex + uuid.uuid4().hex
+        self.name = name
+        self.config = config
+        self.status = 'created'
+        self.created = time.time()
+        self.started_at = None
+        self.host_config = config.get('HostConfig') or {}
+        self.labels = config.get('Labels') or {}
+        self.image = normalize_image(config.get('Image', ''))
+        self.ip = '172.17.%d.%d' % (random.randint(0, 255), random.randint(2, 254))
+
+    def host_ports(self):
+        ports = []
+        for bindings in (self.host_config.get('PortBindings') or {}).values():
+            for binding in bindings or []:
+                if binding.get('HostPort'):
+                    ports.append(binding['HostPort'])
+        return ports
+
+    def log_lines(self, since=None, until=None):
+        """容器启动后每 1/LOG_RATE 秒产生一行日志，返回 [(时间, 内容)]"""
+        if self.started_at is None:
+            return []
+        end = min(until or time.time(), time.time())
+        first = 0
+        if since is not None:
+            first = max(int((since - self.started_at) * LOG_RATE) + 1, 0)
+        last = int((end - self.started_at) * LOG_RATE)
+        return [
+            (self.started_at + i / LOG_RATE, f'{self.name} log line {i}\n')
+            for i in range(first, last + 1)
+        ]
+
+    def inspect(self):
+        running = self.status == 'running'
+        bindings = self.host_config.get('PortBindings') or {}
+        return {
+            'Id': self.id,
+            'Name': '/' + self.name,
+            'Created': datetime.fromtimestamp(self.created, timezone.utc).isoformat(),
+            'Image': 'sha256:' + self.image.encode().hex()[:64].ljust(64, '0'),
+            'State': {
+                'Status': self.status,
+                'Running': running,
+                'Paused': self.status == 'paused',
+                'Pid': 0,
+                'ExitCode': 0,
+                'StartedAt': datetime.fromtimestamp(self.started_at or 0, timezone.utc).isoformat(),
+            },
+            'Config': {
+                'Image': self.image,
+                'Cmd': self.config.get('Cmd'),
+                'Labels': self.labels,
+                'Tty': bool(self.config.get('Tty')),
+                'WorkingDir': self.config.get('WorkingDir') or '/',
+                'Env': self.config.get('Env') or [],
+            },
+            'HostConfig': dict(self.host_config, NetworkMode=self.host_config.get('NetworkMode') or 'default'),
+            'NetworkSettings': {
+                'IPAddress': self.ip if running else '',
+                'Ports': {
+                    port: [{'HostIp': '0.0.0.0', 'HostPort': b.get('HostPort')} for b in items or []]
+                    for port, items in bindings.items()
+                } if running else {},
+            },
+            'GraphDriver': {'Name': 'overlay2', 'Data': {'MergedDir': f'/nonexistent/{self.id}/merged'}},
+        }
+
+    def summary(self):
+        return {
+            'Id': self.id,
+            'Names': ['/' + self.name],
+            'Image': self.image,
+            'Labels': self.labels,
+            'State': self.status,
+            'Status': self.status,
+            'Created': int(self.created),
+        }
+
+class FakeExec:
+    def __init__(self, container, config):
+        self.id = uuid.uuid4().hex + uuid.uuid4().hex
+        self.container = container
+        self.cmd = config.get('Cmd') or []
+        if isinstance(self.cmd, str):
+            self.cmd = shlex.split(self.cmd)
+        self.tty = bool(config.get('Tty'))
+        self.running = False
+        self.exit_code = None
+        self.size = (80, 24)
+
+class FakeDocker:
+    """内存中的 Docker 守护进程状态"""
+
+    def __init__(self, latencies=None, jitter=0.0, ncpu=64, mem_total=256 << 30, images=()):
+        self.lock = threading.Lock()
+        self.latencies = latencies or {}
+        self.jitter = jitter
+        self.ncpu = ncpu
+        self.mem_total = mem_total
+        self.containers = {}
+        self.names = {}
+        self.execs = {}
+        self.images = {normalize_image(name): self._image(name) for name in images}
+        self.events = deque(maxlen=EVENT_HISTORY)
+        self.subscribers = []
+        # 每种操作的调用次数
+        self.calls = {}
+
+    def _image(self, name):
+        name = normalize_image(name)
+        digest = 'sha256:' + uuid.uuid5(uuid.NAMESPACE_URL, name).hex * 2
+        return {
+            'Id': digest,
+            'RepoTags': [name],
+            'RepoDigests': [name.rsplit(':', 1)[0] + '@' + digest],
+            'Size': 50 * 1024 * 1024,
+            'Created': now_iso(),
+        }
+
+    def delay(self, op):
+        with self.lock:
+            self.calls[op] = self.calls.get(op, 0) + 1
+        seconds = self.latencies.get(op, self.latencies.get('default', DEFAULT_LATENCY))
+        if self.jitter:
+            seconds *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def find(self, ref):
+        """按完整 ID、ID 前缀或名称查找容器"""
+        with self.lock:
+            if ref in self.containers:
+                return self.containers[ref]
+            name = ref.lstrip('/')
+            if name in self.names:
+                return self.containers[self.names[name]]
+            for cid, cont in self.containers.items():
+                if cid.startswith(ref):
+                    return cont
+        return None
+
+    def publish(self, cont, action):
+        event = {
+            'Type': 'container',
+            'Action': action,
+            'status': action,
+            'id': cont.id,
+            'from': cont.image,
+            'Actor': {'ID': cont.id, 'Attributes': dict(cont.labels, name=cont.name, image=cont.image)},
+            'time': int(time.time()),
+            'timeNano': time.time_ns(),
+        }
+        with self.lock:
+            self.events.append(event)
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            q.put(event)
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def docker(self):
+        return self.server.docker
+
+    # ---------- 响应 ----------
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_empty(self, status=204):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_error_json(self, status, message):
+        self.send_json({'message': message}, status)
+
+    def start_stream(self, content_type='application/json'):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def client_gone(self):
+        """长连接空闲时检查客户端是否已经断开"""
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+    def write_chunk(self, data):
+        """写出一个分块，客户端断开时返回 False"""
+        try:
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+            return True
+        except OSError:
+            return False
+
+    def end_stream(self):
+        try:
+            self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+        except OSError:
+            self.close_connection = True
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    # ---------- 路由 ----------
+    def dispatch(self, method):
+        parsed = urlparse(self.path)
+        # 去掉 /v1.43 这样的版本前缀
+        path = re.sub(r'^/v[\d.]+', '', parsed.path)
+        self.query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        for route_method, pattern, handler in ROUTES:
+            if route_method != method:
+                continue
+            match = pattern.fullmatch(path)
+            if match:
+                try:
+                    handler(self, *[unquote(g) for g in match.groups()])
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+                return
+        self.read_json()
+        self.send_error_json(404, f'page not found: {method} {path}')
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_HEAD(self):
+        self.dispatch('HEAD')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    # ---------- 系统 ----------
+    def ping(self):
+        body = b'OK'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Api-Version', API_VERSION)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def version(self):
+        self.docker.delay('version')
+        self.send_json({
+            'Version': '24.0.0-fake',
+            'ApiVersion': API_VERSION,
+            'MinAPIVersion': '1.12',
+            'Os': 'linux',
+            'Arch': 'amd64',
+        })
+
+    def info(self):
+        self.docker.delay('info')
+        with self.docker.lock:
+            statuses = [c.status for c in self.docker.containers.values()]
+            image_count = len(self.docker.images)
+        self.send_json({
+            'ID': 'FAKE',
+            'Name': 'fake-docker',
+            'NCPU': self.docker.ncpu,
+            'MemTotal': self.docker.mem_total,
+            'Containers': len(statuses),
+            'ContainersRunning': statuses.count('running'),
+            'ContainersPaused': statuses.count('paused'),
+            'ContainersStopped': statuses.count('exited'),
+            'Images': image_count,
+            'ServerVersion': '24.0.0-fake',
+        })
+
+    # ---------- 容器 ----------
+    def container_create(self):
+        config = self.read_json()
+        self.docker.delay('create')
+        name = self.query.get('name') or uuid.uuid4().hex[:12]
+        image = normalize_image(config.get('Image', ''))
+        with self.docker.lock:
+            if image not in self.docker.images:
+                missing = True
+            else:
+                missing = False
+                if name in self.docker.names:
+                    conflict = self.docker.names[name]
+                else:
+                    conflict = None
+                    cont = FakeContainer(name, config)
+                    self.docker.containers[cont.id] = cont
+                    self.docker.names[name] = cont.id
+        if missing:
+            return self.send_error_json(404, f'No such image: {image}')
+        if conflict:
+            return self.send_error_json(
+                409, f'Conflict. The container name "/{name}" is already in use by container "{conflict}".'
+            )
+        self.docker.publish(cont, 'create')
+        self.send_json({'Id': cont.id, 'Warnings': []}, 201)
+
+    def container_start(self, ref):
+        self.read_json()
+        self.docker.delay('start')
+        cont = self.docker.find(ref)
+        if cont is None:
+            return self.send_error_json(404, f'No such container: {ref}')
+        if cont.status == 'running':
+            return self.send_empty(304)
+        with self.docker.lock:
+            used = set()
+            for other in self.docker.containers.values():
+                if other is not cont and other.status == 'running':
+                    used.update(other.host_ports())
+            conflict = next((p for p in cont.host_ports() if p in used), None)
+            if conflict is None:
+                cont.status = 'running'
+                cont.started_at = time.time()
+        if conflict is not None:
+            return self.send_error_json(
+                500, f'driver failed programming external connectivity on endpoint {cont.name}: '
+                     f'Bind for 0.0.0.0:{conflict} failed: port is already allocated'
+            )
+        self.docker.publish(cont, 'start')
+        self.send_empty()
+
+    def container_stop(self, ref):
+        self.read_json()
+        self.docker.delay('stop')
+        cont = self.docker.find(ref)
+        if cont is None:
+            return self.send_error_json(404, f'No such container: {ref}')
+        if cont.status != 'running':
+            return self.send_empty(304)
+        cont.status = 'exited'
+        self.docker.publish(cont, 'die')
+        self.docker.publish(cont, 'stop')
+        self.send_empty()
+
+    def container_restart(self, ref):
+        self.read_json()
+        self.docker.delay('restart')
+        cont = self.docker.find(ref)
+        if cont is None:
+            return self.send_error_json(404, f'No such container: {ref}')
+        cont.status = 'running'
+        cont.started_at = time.time()
+        self.docker.publish(cont, 'restart')
+        self.send_empty()
+
+    def container_rename(self, ref):
+        self.read_json()
+        self.docker.delay('rename')
+        cont = self.docker.find(ref)
+        if cont is None:
+            return self.send_error_json(404, f'No such container: {ref}')
+        name = self.query.get('name', '')
+        with self.docker.lock:
+            taken = name in self.docker.names
+            if not taken:
+                del self.docker.names[cont.name]
+                cont.name = name
+                self.docker.names[name] = cont.id
+        if taken:
+            return self.send_error_json(409, f'Conflict. The container name "/{name}" is already in use')
+        self.docker.publish(cont, 'rename')
+        self.send_empty()
+
+    def container_remove(self, ref):
+        self.docker.delay('remove')
+        cont = self.docker.find(ref)
+        if cont is None:
+            return self.send_error_json(404, f'No such container: {ref}')
+        if cont.status == 'running' and self.query.get('force') not in ('1', 'true', 'True'):
+            return self.send_error_json(409, f'You cannot remove a running container {cont.id}.')
+        was_running = cont.status == 'running'
+        with self.docker.lock:
+            self.docker.containers.pop(cont.id, None)
+            self.docker.names.pop(cont.name, None)
+        cont.status = 'removed'
+        if was_running:
+            self.docker.publish(cont, 'die')
+        self.docker.publish(cont, 'destroy')
+        self.send_empty()
+
+    def container_inspect(self, ref):
+        self.docker.delay('inspect')
+        cont = self.docker.find(ref)
+        if cont is None:
+            return self.send_error_json(404, f'No such container: {ref}')
+        self.send_json(cont.inspect())
+
+    def container_list(self):
+        self.docker.delay('list')
+        filters = json.loads(self.query.get('filters') or '{}')
+        show_all = self.query.get('all') in ('1', 'true', 'True')
+        with self.docker.lock:
+            containers = list(self.docker.containers.values())
+        result = []
+        for cont in containers:
+            if not show_all and cont.status != 'running':
+                continue
+            if not self.match_filters(cont, filters):
+                continue
+            result.append(cont.summary())
+        self.send_json(result)
+
+    @staticmethod
+    def match_filters(cont, filters):
+        # docker-py 把单个值也编码成列表
+        for label in filters.get('label', []):
+            key, _, value = label.partition('=')
+            if key not in cont.labels or (value and cont.labels[key] != value):
+                return False
+        for image in filters.get('ancestor', []):
+            if cont.image != normalize_image(image):
+                return False
+        if filters.get('status') and cont.status not in filters['status']:
+            return False
+        if filters.get('name') and not any(n in cont.name for n in filters['name']):
+            return False
+        if filters.get('id') and not any(cont.id.startswith(i) for i in filters['id']):
+            return False
+        return True
+
+    def container_stats(self, ref):
+        self.docker.delay('stats')
+        cont = self.docker.find(ref)
+        if cont is None:
+            return self.send_error_json(404, f'No such container: {ref}')
+        stream = self.query.get('stream', '1') in ('1', 'true', 'True')
+        cpu_total = 0
+        system_total = 0
+        previous = {}
+        if not stream:
+            return self.send_json(self.stats_sample(cont, previous, 0, 0))
+        self.start_stream()
+        while cont.status == 'running':
+            cpu_total += int(random.uniform(0, 0.5) * 1e9 * STATS_INTERVAL)
+            system_total += int(self.docker.ncpu * 1e9 * STATS_INTERVAL)
+            sample = self.stats_sample(cont, previous, cpu_total, system_total)
+            previous = sample['cpu_stats']
+            if not self.write_chunk(json.dumps(sample).encode() + b'\n'):
+                return
+            time.sleep(STATS_INTERVAL)
+        self.end_stream()
+
+    def stats_sample(self, cont, previous, cpu_total, system_total):
+        elapsed = time.time() - (cont.started_at or time.time())
+        return {
+            'read': now_iso(),
+            'id': cont.id,
+            'name': '/' + cont.name,
+            'cpu_stats': {
+                'cpu_usage': {'total_usage': cpu_total},
+                'system_cpu_usage': system_total,
+                'online_cpus': self.docker.ncpu,
+            },
+            'precpu_stats': previous,
+            'memory_stats': {'usage': random.randint(20, 200) << 20, 'limit': self.docker.mem_total},
+            'networks': {'eth0': {'rx_bytes': int(elapsed * 2048), 'tx_bytes': int(elapsed * 1024)}},
+            'blkio_stats': {'io_service_bytes_recursive': [
+                {'op': 'Read', 'value': int(elapsed * 4096)},
+                {'op': 'Write', 'value': int(elapsed * 8192)},
+            ]},
+        }
+
+    def container_logs(self, ref):
+        self.docker.delay('logs')
+        cont = self.docker.find(ref)
+        if cont is None:
+            return self.send_error_json(404, f'No such container: {ref}')
+        since = float(self.query['since']) if self.query.get('since') else None
+        tail = self.query.get('tail', 'all')
+        timestamps = self.query.get('timestamps') in ('1', 'true', 'True')
+        follow = self.query.get('follow') in ('1', 'true', 'True')
+        tty = bool(cont.config.get('Tty'))
+
+        def frame(ts, line):
+            data = line.encode()
+            if timestamps:
+                data = datetime.fromtimestamp(ts, timezone.utc).isoformat().replace('+00:00', 'Z').encode() + b' ' + data
+            # 非 tty 容器的日志使用 stdout/stderr 多路复用格式
+            return data if tty else struct.pack('>BxxxL', 1, len(data)) + data
+
+        lines = cont.log_lines(since=since)
+        if tail != 'all':
+            lines = lines[-int(tail):] if int(tail) > 0 else []
+        last = lines[-1][0] if lines else (since if since is not None else time.time())
+
+        self.start_stream('application/vnd.docker.raw-stream' if tty else 'application/vnd.docker.multiplexed-stream')
+        if lines and not self.write_chunk(b''.join(frame(ts, line) for ts, line in lines)):
+            return
+        while follow and cont.status == 'running':
+            time.sleep(1 / LOG_RATE)
+            lines = cont.log_lines(since=last)
+            if lines:
+                last = lines[-1][0]
+                if not self.write_chunk(b''.join(frame(ts, line) for ts, line in lines)):
+                    return
+        self.end_stream()
+
+    # ---------- exec ----------
+    def exec_create(self, ref):
+        config = self.read_json()
+        self.docker.delay('exec_create')
+        cont = self.docker.find(ref)
+        if cont is None:
+            return self.send_error_json(404, f'No such container: {ref}')
+        if cont.status != 'running':
+            return self.send_error_json(409, f'Container {cont.id} is not running')
+        ex = FakeExec(cont, config)
+        with self.docker.lock:
+            self.docker.execs[ex.id] = ex
+        self.send_json({'Id': ex.id}, 201)
+
+    def exec_start(self, exec_id):
+        self.read_json()
+        self.docker.delay('exec_start')
+        with self.docker.lock:
+            ex = self.docker.execs.get(exec_id)
+        if ex is None:
+            return self.send_error_json(404, f'No such exec instance: {exec_id}')
+        if self.headers.get('Upgrade', '').lower() != 'tcp':
+            return self.send_error_json(400, 'fake docker only supports attached exec with Upgrade: tcp')
+
+        # 升级为原始 TCP 连接，之后的读写都不再是 HTTP
+        self.send_response(101)
+        self.send_header('Content-Type', 'application/vnd.docker.raw-stream')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Upgrade', 'tcp')
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        ex.running = True
+        time.sleep(EXEC_STARTUP)
+        try:
+            self.run_exec(ex, self.connection)
+        finally:
+            ex.running = False
+            if ex.exit_code is None:
+                ex.exit_code = 0
+            try:
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def run_exec(self, ex, conn):
+        program = ex.cmd[0].rsplit('/', 1)[-1] if ex.cmd else 'sh'
+        if program == 'yes':
+            # 持续输出，直到客户端断开或发送 Ctrl-C
+            line = ((' '.join(ex.cmd[1:]) or 'y') + ('\r\n' if ex.tty else '\n')).encode()
+            block = line * max(16384 // len(line), 1)
+            conn.setblocking(False)
+            while ex.container.status == 'running':
+                try:
+                    data = conn.recv(4096)
+                    if not data or b'\x03' in data:
+                        ex.exit_code = 130
+                        return
+                except BlockingIOError:
+                    pass
+                try:
+                    conn.sendall(block)
+                except BlockingIOError:
+                    time.sleep(0.001)
+                except OSError:
+                    return
+            return
+
+        shell = program in ('sh', 'bash', 'ash', 'zsh')
+        prompt = b'$ '
+        if shell:
+            conn.sendall(prompt)
+        buffer = b''
+        while ex.container.status == 'running':
+            try:
+                data = conn.recv(65536)
+            except OSError:
+                return
+            if not data:
+                return
+            if b'\x04' in data:
+                ex.exit_code = 0
+                return
+            # tty 回显：输入原样返回，回车换成 \r\n
+            conn.sendall(data.replace(b'\r', b'\r\n') if ex.tty else data)
+            if shell:
+                buffer += data
+                while b'\r' in buffer or b'\n' in buffer:
+                    cmd, _, buffer = re.split(rb'(\r|\n)', buffer, maxsplit=1)
+                    if cmd.strip() == b'exit':
+                        ex.exit_code = 0
+                        return
+                    conn.sendall(prompt)
+
+    def exec_inspect(self, exec_id):
+        self.docker.delay('exec_inspect')
+        with self.docker.lock:
+            ex = self.docker.execs.get(exec_id)
+        if ex is None:
+            return self.send_error_json(404, f'No such exec instance: {exec_id}')
+        self.send_json({
+            'ID': ex.id,
+            'Running': ex.running,
+            'ExitCode': ex.exit_code,
+            'ContainerID': ex.container.id,
+            'Pid': 0,
+            'ProcessConfig': {'entrypoint': ex.cmd[0] if ex.cmd else '', 'arguments': ex.cmd[1:], 'tty': ex.tty},
+        })
+
+    def exec_resize(self, exec_id):
+        self.read_json()
+        self.docker.delay('exec_resize')
+        with self.docker.lock:
+            ex = self.docker.execs.get(exec_id)
+        if ex is None:
+            return self.send_error_json(404, f'No such exec instance: {exec_id}')
+        if not ex.running:
+            return self.send_error_json(409, f'exec {exec_id} is not running')
+        ex.size = (int(self.query.get('w', 80)), int(self.query.get('h', 24)))
+        self.send_empty(201)
+
+    # ---------- 事件 ----------
+    def events(self):
+        self.docker.delay('events')
+        filters = json.loads(self.query.get('filters') or '{}')
+        since = float(self.query['since']) if self.query.get('since') else None
+        q = queue.Queue()
+        with self.docker.lock:
+            backlog = [e for e in self.docker.events if since is not None and e['time'] >= since]
+            self.docker.subscribers.append(q)
+        try:
+            self.start_stream()
+            for event in backlog:
+                q.put(event)
+            while True:
+                try:
+                    event = q.get(timeout=5)
+                except queue.Empty:
+                    if self.client_gone():
+                        return
+                    continue
+                if filters.get('type') and event['Type'] not in filters['type']:
+                    continue
+                labels = event['Actor']['Attributes']
+                if not all(
+                    l.partition('=')[0] in labels and (not l.partition('=')[2] or labels[l.partition('=')[0]] == l.partition('=')[2])
+                    for l in filters.get('label', [])
+                ):
+                    continue
+                if not self.write_chunk(json.dumps(event).encode() + b'\n'):
+                    return
+        finally:
+            with self.docker.lock:
+                self.docker.subscribers.remove(q)
+
+    # ---------- 镜像 ----------
+    def image_inspect(self, name):
+        self.docker.delay('image_inspect')
+        with self.docker.lock:
+            image = self.docker.images.get(normalize_image(name))
+            if image is None:
+                image = next((i for i in self.docker.images.values() if i['Id'] == name), None)
+        if image is None:
+            return self.send_error_json(404, f'No such image: {name}')
+        self.send_json(image)
+
+    def image_pull(self):
+        self.read_json()
+        name = self.query.get('fromImage', '')
+        if self.query.get('tag'):
+            name = f"{name}:{self.query['tag']}"
+        name = normalize_image(name)
+        self.start_stream()
+        self.write_chunk(json.dumps({'status': f'Pulling from {name}', 'id': name.rsplit(':', 1)[-1]}).encode() + b'\n')
+        layers = [uuid.uuid4().hex[:12] for _ in range(3)]
+        total = 10 * 1024 * 1024
+        for step in range(1, 5):
+            # pull 的延迟平均分摊到下载过程中
+            self.docker.delay('pull')
+            for layer in layers:
+                event = {'status': 'Downloading', 'id': layer,
+                         'progressDetail': {'current': total * step // 4, 'total': total}}
+                if not self.write_chunk(json.dumps(event).encode() + b'\n'):
+                    return
+        for layer in layers:
+            self.write_chunk(json.dumps({'status': 'Download complete', 'id': layer}).encode() + b'\n')
+            self.write_chunk(json.dumps({'status': 'Pull complete', 'id': layer}).encode() + b'\n')
+        with self.docker.lock:
+            self.docker.images[name] = self.docker._image(name)
+        self.write_chunk(json.dumps({'status': f'Status: Downloaded newer image for {name}'}).encode() + b'\n')
+        self.end_stream()
+
+    def image_remove(self, name):
+        self.docker.delay('image_remove')
+        name = normalize_image(name)
+        with self.docker.lock:
+            in_use = any(c.image == name for c in self.docker.containers.values())
+            image = None if in_use else self.docker.images.pop(name, None)
+        if in_use:
+            return self.send_error_json(409, f'conflict: unable to remove repository reference "{name}"')
+        if image is None:
+            return self.send_error_json(404, f'No such image: {name}')
+        self.send_json([{'Untagged': name}, {'Deleted': image['Id']}])
+
+H = FakeDockerHandler
+ROUTES = [
+    (method, re.compile(pattern), handler) for method, pattern, handler in [
+        ('GET', r'/_ping', H.ping),
+        ('HEAD', r'/_ping', H.ping),
+        ('GET', r'/version', H.version),
+        ('GET', r'/info', H.info),
+        ('POST', r'/containers/create', H.container_create),
+        ('GET', r'/containers/json', H.container_list),
+        ('POST', r'/containers/([^/]+)/start', H.container_start),
+        ('POST', r'/containers/([^/]+)/stop', H.container_stop),
+        ('POST', r'/containers/([^/]+)/restart', H.container_restart),
+        ('POST', r'/containers/([^/]+)/rename', H.container_rename),
+        ('DELETE', r'/containers/([^/]+)', H.container_remove),
+        ('GET', r'/containers/([^/]+)/json', H.container_inspect),
+        ('GET', r'/containers/([^/]+)/stats', H.container_stats),
+        ('GET', r'/containers/([^/]+)/logs', H.container_logs),
+        ('POST', r'/containers/([^/]+)/exec', H.exec_create),
+        ('POST', r'/exec/([^/]+)/start', H.exec_start),
+        ('GET', r'/exec/([^/]+)/json', H.exec_inspect),
+        ('POST', r'/exec/([^/]+)/resize', H.exec_resize),
+        ('GET', r'/events', H.events),
+        ('POST', r'/images/create', H.image_pull),
+        ('GET', r'/images/(.+)/json', H.image_inspect),
+        ('DELETE', r'/images/(.+)', H.image_remove),
+    ]
+]
+
+class FakeDockerServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 压测时会有上千条并发的 stats / logs / events 长连接
+    request_queue_size = 1024
+
+    def __init__(self, address, docker):
+        super().__init__(address, FakeDockerHandler)
+        self.docker = docker
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'tcp://{host}:{port}'
+
+def serve(host='127.0.0.1', port=0, **kwargs):
+    """在后台线程启动一个模拟节点，返回 server；server.docker 是它的内存状态"""
+    server = FakeDockerServer((host, port), FakeDocker(**kwargs))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    global LOG_RATE
+    parser = argparse.ArgumentParser(description='模拟 Docker Engine API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2375)
+    parser.add_argument('--latency', default='', help='各操作的延迟（秒），例如 create=0.2,pull=0.5,default=0.002')
+    parser.add_argument('--jitter', type=float, default=0.0, help='延迟随机浮动比例，例如 0.2 表示 ±20%%')
+    parser.add_argument('--ncpu', type=int, default=64)
+    parser.add_argument('--mem', type=int, default=256, help='内存总量（GiB）')
+    parser.add_argument('--image', action='append', default=[], help='启动时就已存在的镜像，可重复')
+    parser.add_argument('--log-rate', type=float, default=LOG_RATE, help='每个容器每秒输出的日志行数')
+    args = parser.parse_args()
+    LOG_RATE = args.log_rate
+
+    server = FakeDockerServer((args.host, args.port), FakeDocker(
+        latencies=parse_latencies(args.latency), jitter=args.jitter,
+        ncpu=args.ncpu, mem_total=args.mem << 30, images=args.image
+    ))
+    print(f'Fake Docker Engine listening on {server.base_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,456 @@
+"""终端和日志命名空间的 WebSocket 吞吐压测
+
+    python benchmarks/socket_throughput.py --mode echo --clients 200            # 每个终端定时敲键，统计回显延迟
+    python benchmarks/socket_throughput.py --mode yes --clients 50              # 终端里运行 yes，统计输出吞吐
+    python benchmarks/socket_throughput.py --mode cat --clients 20 --size 20    # 向 cat 写入 20MB，统计回显吞吐
+    python benchmarks/socket_throughput.py --mode logs --clients 1000 --containers 50 --log-rate 100
+
+会启动三个进程：模拟 Docker 节点（benchmarks/fake_docker.py）、应用服务（socketio.run，临时 SQLite 数据库）
+和本进程里的 N 个真实 Socket.IO 客户端。客户端通过 WebSocket 连接，需要安装 websocket-client，
+否则 python-socketio 会退回长轮询。
+
+结果包括收到的字节数 / 秒、帧数 / 秒、平均帧大小、回显延迟直方图，以及应用进程的 CPU 占用和 RSS
+（读取 /proc，仅 Linux）。加 --json 输出 JSON，便于前后对比。
+"""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import socket
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 回显延迟直方图的分桶上限（毫秒）
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000]
+# cat 模式下未回显的数据上限，超过时等待
+CAT_WINDOW = 256 * 1024
+CAT_CHUNK = 4096
+READY_TIMEOUT = 60
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_port(port, proc, timeout=READY_TIMEOUT):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise Exception(f'process exited with {proc.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise Exception(f'port {port} not ready')
+
+class ProcessSampler:
+    """每秒从 /proc 读取一次进程的 CPU 时间和 RSS"""
+
+    def __init__(self, pid, interval=1.0):
+        self.pid = pid
+        self.interval = interval
+        self.cpu = []
+        self.rss = []
+        self.stopped = threading.Event()
+        self.ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+    def read(self):
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / self.ticks
+        rss = 0
+        with open(f'/proc/{self.pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1]) * 1024
+        return cpu, rss
+
+    def run(self):
+        try:
+            last_cpu, _ = self.read()
+        except OSError:
+            return
+        last = time.time()
+        while not self.stopped.wait(self.interval):
+            try:
+                cpu, rss = self.read()
+            except OSError:
+                return
+            now = time.time()
+            self.cpu.append((cpu - last_cpu) / (now - last) * 100)
+            self.rss.append(rss)
+            last_cpu, last = cpu, now
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def summary(self):
+        if not self.cpu:
+            return {}
+        return {
+            'cpu_avg_percent': round(sum(self.cpu) / len(self.cpu), 1),
+            'cpu_max_percent': round(max(self.cpu), 1),
+            'rss_max_mb': round(max(self.rss) / 1024 / 1024, 1),
+            'rss_last_mb': round(self.rss[-1] / 1024 / 1024, 1),
+        }
+
+class Meter:
+    """所有客户端共用的计数器"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bytes = 0
+        self.frames = 0
+        self.sent = 0
+        self.latencies = []
+        self.errors = {}
+        self.started = None
+        self.stopped = None
+
+    def frame(self, size):
+        with self.lock:
+            self.bytes += size
+            self.frames += 1
+
+    def send(self, size):
+        with self.lock:
+            self.sent += size
+
+    def latency(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def fail(self, reason):
+        with self.lock:
+            reason = str(reason)[:80]
+            self.errors[reason] = self.errors.get(reason, 0) + 1
+
+    def summary(self):
+        elapsed = (self.stopped or time.time()) - self.started
+        result = {
+            'seconds': round(elapsed, 2),
+            'bytes_per_s': round(self.bytes / elapsed),
+            'mb_per_s': round(self.bytes / elapsed / 1024 / 1024, 2),
+            'frames_per_s': round(self.frames / elapsed, 1),
+            'avg_frame_bytes': round(self.bytes / self.frames) if self.frames else 0,
+            'sent_bytes': self.sent,
+        }
+        samples = sorted(self.latencies)
+        if samples:
+            pct = lambda p: round(samples[min(int(len(samples) * p), len(samples) - 1)] * 1000, 2)
+            histogram = {}
+            for bucket in BUCKETS_MS:
+                histogram[f'<={bucket}ms'] = sum(1 for s in samples if s * 1000 <= bucket)
+            histogram[f'>{BUCKETS_MS[-1]}ms'] = sum(1 for s in samples if s * 1000 > BUCKETS_MS[-1])
+            # 直方图按区间计数，而不是累计
+            previous = 0
+            for key in list(histogram)[:-1]:
+                histogram[key], previous = histogram[key] - previous, histogram[key]
+            result['echo'] = {
+                'count': len(samples),
+                'p50_ms': pct(0.5),
+                'p90_ms': pct(0.9),
+                'p99_ms': pct(0.99),
+                'max_ms': round(samples[-1] * 1000, 2),
+                'histogram': histogram,
+            }
+        if self.errors:
+            result['errors'] = self.errors
+        return result
+
+class Client:
+    """一个真实的 Socket.IO 客户端"""
+
+    def __init__(self, bench, container_id):
+        import socketio
+        self.bench = bench
+        self.meter = bench.meter
+        self.container_id = container_id
+        # websocket-client 默认用纯 Python 校验每个文本帧的 UTF-8，大吞吐时客户端自己会先成为瓶颈
+        self.sio = socketio.Client(reconnection=False, websocket_extra_options={'skip_utf8_validation': True})
+        self.received = 0
+        self.ready = threading.Event()
+        self.done = threading.Event()
+        self.echo = threading.Condition()
+
+    def connect(self, namespace):
+        transports = ['websocket'] if self.bench.websocket else None
+        self.sio.connect(self.bench.url, namespaces=[namespace], transports=transports,
+                         headers={'Cookie': self.bench.cookie}, wait_timeout=READY_TIMEOUT)
+
+    def close(self):
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+    # ---------- 终端 ----------
+    def run_terminal(self, mode, stop_at):
+        ns = '/container_terminal'
+
+        @self.sio.on('terminal_output', namespace=ns)
+        def on_output(data):
+            size = len(data['output'].encode('utf-8'))
+            self.meter.frame(size)
+            with self.echo:
+                self.received += size
+                self.echo.notify_all()
+            if not self.ready.is_set():
+                self.ready.set()
+            # 返回值作为 ack 发回服务端，服务端据此做背压
+            return True
+
+        @self.sio.on('error', namespace=ns)
+        def on_error(data):
+            self.meter.fail(data.get('message'))
+            self.ready.set()
+            self.done.set()
+
+        @self.sio.on('terminal_exit', namespace=ns)
+        def on_exit(data):
+            self.done.set()
+
+        self.connect(ns)
+        command = {'echo': 'sh', 'yes': 'yes', 'cat': 'cat'}[mode]
+        self.sio.emit('start_terminal', {'container_id': self.container_id, 'command': command,
+                                         'cols': 120, 'rows': 40}, namespace=ns)
+        if mode != 'cat' and not self.ready.wait(READY_TIMEOUT):
+            raise Exception('no terminal output')
+        if mode == 'echo':
+            self.type_keys(ns, stop_at)
+        elif mode == 'cat':
+            self.cat(ns, stop_at)
+        else:
+            self.done.wait(max(stop_at - time.time(), 0))
+
+    def wait_echo(self, expected, timeout):
+        deadline = time.time() + timeout
+        with self.echo:
+            while self.received < expected:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.echo.wait(remaining)
+        return True
+
+    def type_keys(self, ns, stop_at):
+        """按固定间隔敲一个键，测量从发送到回显的时间；不发回车，回显与输入一一对应"""
+        interval = self.bench.args.interval
+        # 提示符 "$ " 已经计入 received
+        expected = self.received
+        while time.time() < stop_at and not self.done.is_set():
+            key = random.choice(string.ascii_letters)
+            expected += 1
+            sent = time.perf_counter()
+            self.sio.emit('terminal_input', {'input': key}, namespace=ns)
+            self.meter.send(1)
+            if self.wait_echo(expected, READY_TIMEOUT):
+                self.meter.latency(time.perf_counter() - sent)
+            else:
+                raise Exception('echo timeout')
+            time.sleep(max(interval - (time.perf_counter() - sent), 0) * random.uniform(0.5, 1.5))
+
+    def cat(self, ns, stop_at):
+        """向 cat 持续写入数据，未回显的数据超过窗口时等待"""
+        remaining = self.bench.args.size * 1024 * 1024
+        payload = ''.join(random.choice(string.ascii_letters) for _ in range(CAT_CHUNK))
+        sent = 0
+        while remaining > 0 and time.time() < stop_at and not self.done.is_set():
+            if not self.wait_echo(sent - CAT_WINDOW, READY_TIMEOUT):
+                raise Exception('cat echo timeout')
+            chunk = payload[:min(CAT_CHUNK, remaining)]
+            self.sio.emit('terminal_input', {'input': chunk}, namespace=ns)
+            sent += len(chunk)
+            remaining -= len(chunk)
+            self.meter.send(len(chunk))
+        self.wait_echo(sent, max(stop_at - time.time(), 1))
+
+    # ---------- 日志 ----------
+    def run_logs(self, stop_at):
+        ns = '/container_logs'
+
+        @self.sio.on('log_message', namespace=ns)
+        def on_log(data):
+            if data.get('data'):
+                self.meter.frame(len(data['data'].encode('utf-8')))
+
+        self.connect(ns)
+        self.sio.emit('start_logs', {'container_id': self.container_id, 'tail': 100}, namespace=ns)
+        time.sleep(max(stop_at - time.time(), 0))
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.meter = Meter()
+        self.procs = []
+        self.websocket = importlib.util.find_spec('websocket') is not None
+        if not self.websocket:
+            print('websocket-client not installed, falling back to long-polling')
+
+    def spawn(self, argv, env=None):
+        proc = subprocess.Popen([sys.executable] + argv, cwd=ROOT, env=env,
+                                stdout=subprocess.DEVNULL if not self.args.verbose else None,
+                                stderr=subprocess.STDOUT if not self.args.verbose else None)
+        self.procs.append(proc)
+        return proc
+
+    def start(self, workdir):
+        docker_port = free_port()
+        docker = self.spawn([os.path.join(HERE, 'fake_docker.py'), '--port', str(docker_port),
+                             '--image', self.args.image, '--log-rate', str(self.args.log_rate),
+                             '--latency', self.args.latency])
+        wait_port(docker_port, docker)
+
+        app_port = free_port()
+        env = dict(os.environ)
+        env.update({
+            'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}?timeout=30",
+            'DOCKER_NODES': f'fake|tcp://127.0.0.1:{docker_port}|127.0.0.1',
+            'STATS_HISTORY': '0',
+            'AUDIT_SPILL_FILE': os.path.join(workdir, 'audit_spill.jsonl'),
+            'SECRET_KEY': 'bench',
+            'ADMIN_USERNAME': 'admin',
+            'ADMIN_PASSWORD': 'admin',
+        })
+        self.server = self.spawn([os.path.abspath(__file__), '--serve', str(app_port),
+                                  '--containers', str(self.containers)], env=env)
+        wait_port(app_port, self.server)
+        self.url = f'http://127.0.0.1:{app_port}'
+
+    @property
+    def containers(self):
+        # 同一容器只允许一个终端会话，终端模式下每个客户端各用一个容器
+        return self.args.containers if self.args.mode == 'logs' else self.args.clients
+
+    def setup(self):
+        import requests
+        http = requests.Session()
+        http.post(f'{self.url}/login', data={'username': 'admin', 'password': 'admin'})
+        self.cookie = '; '.join(f'{k}={v}' for k, v in http.cookies.items())
+        http.post(f'{self.url}/template/add', data={
+            'name': 'bench', 'image': self.args.image, 'cpu_limit': '', 'mem_limit': '',
+            'disk_limit': '', 'command': '', 'container_port': '80',
+        })
+        template_id = next(t['id'] for t in http.get(f'{self.url}/template/catalog').json()['templates']
+                           if t['name'] == 'bench')
+
+        container_ids = []
+        jobs = []
+        while len(container_ids) < self.containers:
+            while len(jobs) + len(container_ids) < self.containers:
+                result = http.post(f'{self.url}/container/create', data={'template_id': template_id}).json()
+                if not result['success']:
+                    break
+                jobs.append(result['job_id'])
+            time.sleep(0.2)
+            for job_id in list(jobs):
+                job = http.get(f'{self.url}/container/jobs/{job_id}').json()['job']
+                if job['status'] == 'running':
+                    container_ids.append(job['container_id'])
+                    jobs.remove(job_id)
+                elif job['status'] == 'failed':
+                    raise Exception(job['message'])
+        return container_ids
+
+    def client(self, container_id, stop_at):
+        client = Client(self, container_id)
+        try:
+            if self.args.mode == 'logs':
+                client.run_logs(stop_at)
+            else:
+                client.run_terminal(self.args.mode, stop_at)
+        except Exception as e:
+            self.meter.fail(e)
+        finally:
+            client.close()
+
+    def run(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                self.start(workdir)
+                container_ids = self.setup()
+                print(f'mode {self.args.mode}, {self.args.clients} clients, {len(container_ids)} containers, '
+                      f"{'websocket' if self.websocket else 'polling'}")
+
+                sampler = ProcessSampler(self.server.pid)
+                sampler.start()
+                self.meter.started = time.time()
+                stop_at = self.meter.started + self.args.duration
+                with ThreadPoolExecutor(max_workers=self.args.clients) as pool:
+                    for i in range(self.args.clients):
+                        pool.submit(self.client, container_ids[i % len(container_ids)], stop_at)
+                self.meter.stopped = time.time()
+                sampler.stopped.set()
+                self.report(sampler.summary())
+            finally:
+                for proc in self.procs:
+                    proc.terminate()
+                for proc in self.procs:
+                    proc.wait()
+
+    def report(self, server):
+        result = self.meter.summary()
+        result['server'] = server
+        if self.args.json:
+            print(json.dumps(result, indent=2))
+            return
+        print(f"\n{result['seconds']}s, received {result['mb_per_s']} MB/s ({result['bytes_per_s']} B/s), "
+              f"{result['frames_per_s']} frames/s, avg frame {result['avg_frame_bytes']} B, sent {result['sent_bytes']} B")
+        if 'echo' in result:
+            echo = result['echo']
+            print(f"echo latency: p50 {echo['p50_ms']} ms, p90 {echo['p90_ms']} ms, "
+                  f"p99 {echo['p99_ms']} ms, max {echo['max_ms']} ms ({echo['count']} keys)")
+            peak = max(echo['histogram'].values()) or 1
+            for bucket, count in echo['histogram'].items():
+                print(f"  {bucket:>9} {count:>8} {'#' * round(count / peak * 40)}")
+        if server:
+            print(f"server: cpu avg {server['cpu_avg_percent']}%, max {server['cpu_max_percent']}%, "
+                  f"rss max {server['rss_max_mb']} MB")
+        for reason, count in result.get('errors', {}).items():
+            print(f'error: {count} x {reason}')
+
+def serve(port, containers):
+    """应用服务进程：放开配额后用 socketio.run 启动"""
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    from models.settings import SystemSettings
+
+    with app_module.app.app_context():
+        SystemSettings.set_setting('MAX_PER_USER', str(containers + 10))
+        SystemSettings.set_setting('MAX_TOTAL', str(containers + 10))
+    app_module.socketio.run(app_module.app, host='127.0.0.1', port=port,
+                            allow_unsafe_werkzeug=True, log_output=False)
+
+def main():
+    parser = argparse.ArgumentParser(description='终端和日志命名空间的 WebSocket 吞吐压测')
+    parser.add_argument('--mode', choices=['echo', 'yes', 'cat', 'logs'], default='echo')
+    parser.add_argument('--clients', type=int, default=50, help='Socket.IO 客户端数')
+    parser.add_argument('--containers', type=int, default=10, help='logs 模式下的容器数，客户端平均分到各容器')
+    parser.add_argument('--duration', type=float, default=20, help='压测时长（秒）')
+    parser.add_argument('--interval', type=float, default=0.05, help='echo 模式下每个客户端的敲键间隔（秒）')
+    parser.add_argument('--size', type=int, default=10, help='cat 模式下每个客户端写入的数据量（MB）')
+    parser.add_argument('--log-rate', type=float, default=10, help='每个容器每秒输出的日志行数')
+    parser.add_argument('--latency', default='default=0.001', help='模拟节点各操作的延迟（秒），格式见 fake_docker.py')
+    parser.add_argument('--image', default='nginx:latest')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    parser.add_argument('--verbose', action='store_true', help='显示模拟节点和应用服务的输出')
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.containers)
+    else:
+        Bench(args).run()
+
+if __name__ == '__main__':
+    main()
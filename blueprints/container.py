@@ -1,33 +1,33 @@
 import os
+import time
 import random
 import base64
 from datetime import datetime, timedelta
 from docker.errors import NotFound
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
 
-from flask import Blueprint, render_template, request, session, url_for, flash, redirect, current_app
+from flask import Blueprint, render_template, request, session, url_for, flash, redirect, send_file
 from models.template import Template
 from models.container import Container
+from models.quota import Quota
 from models import db
-from utils.auth import get_user_id
-from utils.docker import docker_client
+from utils.auth import get_user_id, admin_required
+from utils.nodes import node_registry
+from utils.expiry import expiry_scheduler
+from utils.stats import stats_cache
+from utils.metrics import metrics_store
+from utils.pagination import keyset_paginate, cached_count
+from utils.counters import dashboard_counters
 from utils.logger import log_action
+from utils.jobs import creation_jobs
+from utils.removal import mark_removed
+from utils.files import list_directory, LIST_PAGE_SIZE, LIST_MAX_PAGE_SIZE
+from sockets.container_terminal import terminal_startup
 
 from utils.settings import get_setting
 
 container_bp = Blueprint('container', __name__, url_prefix='/container')
 
-MAX_PER_USER = 3
-MAX_TOTAL = 20
-
-def check_limits(user_id):
-    user_count = Container.query.filter_by(user_id=user_id).filter(Container.status != 'removed').count()
-    total_count = Container.query.filter(Container.status != 'removed').count()
-    if user_count >= MAX_PER_USER:
-        return False, '每个用户最多 3 个容器'
-    if total_count >= MAX_TOTAL:
-        return False, '总容器数已达上限'
-    return True, ''
-
 @container_bp.route('/create', methods=['POST'])
 def create():
     user_id = get_user_id()
@@ -35,9 +35,6 @@ def create():
     container_name = request.form.get('container_name', '').strip()
     if not template_id:
         return {'success': False, 'message': '模板 ID 必须提供'}
-    ok, msg = check_limits(user_id)
-    if not ok:
-        return {'success': False, 'message': msg}
 
     template = Template.query.get(template_id)
     if not template:
@@ -49,74 +46,84 @@ def create():
     if not all(c in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-" for c in container_name):
         return {'success': False, 'message': '容器名称只能包含字母、数字、下划线和中划线'}
 
-    # 自动分配主机端口
-    used_ports = [c.host_port for c in Container.query.filter(Container.status != 'removed').all()]
-    host_port = 30000
-    while host_port in used_ports:
-        host_port += 1
+    # 先占用名额，创建失败时释放
+    ok, msg = Quota.reserve(user_id)
+    if not ok:
+        return {'success': False, 'message': msg}
+
+    # 拉取镜像、创建容器交给后台任务，进度通过 /container_jobs 推送
+    job = creation_jobs.submit(user_id, template.id, container_name, url_for('container.get_list'))
+    if job is None:
+        Quota.release(user_id)
+        return {'success': False, 'message': '创建任务过多，请稍后再试'}
+    return {'success': True, 'message': '已提交创建任务', 'job_id': job['id']}
+
+@container_bp.route('/jobs/stats')
+@admin_required
+def job_stats():
+    return {'success': True, 'jobs': creation_jobs.snapshot()}
+
+@container_bp.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = creation_jobs.get(job_id)
+    if not job or ('admin' not in session and job['user_id'] != get_user_id()):
+        return {'success': False, 'message': '任务不存在'}
+    return {'success': True, 'job': job}
 
-    # 创建 Docker 容器
-    try:
-        container_config = {
-            "image": template.image,
-            "detach": True,
-            "ports": {f"{template.container_port}/tcp": host_port},
-            "cpu_quota": int(float(template.cpu_limit) * 100000) if template.cpu_limit else None,
-            "mem_limit": template.mem_limit if template.mem_limit else None,
-            "name": f"{user_id}_{container_name}"
-        }
-        if len(template.command.strip()) > 0:
-            container_config["command"] = template.command
-
-        container = docker_client.containers.run(**container_config)
-        docker_id = container.id
-
-        # 默认 2 小时后销毁
-        destroy_time = datetime.now() + timedelta(hours=2)
-        container = Container(
-            name=container_name,
-            user_id=user_id,
-            template_id=template.id,
-            docker_id=docker_id,
-            host_port=host_port,
-            status='running',
-            destroy_time=destroy_time
-        )
-        db.session.add(container)
-        db.session.commit()
-        log_action(f'Create container {docker_id}', user_id)
-        return {'success': True, 'message': '容器创建成功', 'redirect': url_for('container.get_list')}
-    except Exception as e:
-        return {'success': False, 'message': f'容器创建失败: {str(e)}'}
-    
 @container_bp.route('/list')
 def get_list():
     user_id = get_user_id()
     is_admin = 'admin' in session
 
-    page = request.args.get('page', 1, type=int)
     per_page = 6
-    offset = (page - 1) * per_page
+    before = request.args.get('before', type=int)
+    after = request.args.get('after', type=int)
 
     if is_admin:
-        cont_query = Container.query.order_by(Container.id.desc())
+        cont_query = Container.query
+        count_key = ('containers',)
     else:
-        cont_query = Container.query.filter_by(user_id=user_id).filter(Container.status != 'removed').order_by(Container.id.desc())
+        cont_query = Container.query.filter_by(user_id=user_id).filter(Container.status != 'removed')
+        count_key = ('containers', user_id)
     
-    total_items = cont_query.count()
-    containers = cont_query.offset(offset).limit(per_page).all()
-    total_pages = (total_items - 1) // per_page + 1
+    page = keyset_paginate(cont_query, Container.id, per_page, before=before, after=after)
+    total_items = cached_count(count_key, cont_query)
     
     return render_template(
         'container/list.html',
-        containers=containers, 
-        per_page=per_page, 
-        current_page=page, 
+        containers=page['items'], 
+        page=page, 
         total_items=total_items, 
-        total_pages=total_pages, 
         is_admin=is_admin
     )
 
+@container_bp.route('/quota', methods=['POST'])
+@admin_required
+def set_quota():
+    user_id = request.form.get('user_id', '').strip()
+    max_containers = request.form.get('max_containers', '').strip()
+    if not user_id:
+        return {'success': False, 'message': '用户 ID 必须提供'}
+    try:
+        # 留空表示恢复使用全局 MAX_PER_USER
+        limit = int(max_containers) if max_containers else None
+        Quota.set_limit(user_id, limit)
+        log_action(f'Set quota {user_id} {limit}', session['admin'])
+        return {'success': True, 'message': '设置成功'}
+    except Exception as e:
+        db.session.rollback()
+        return {'success': False, 'message': f'设置失败: {str(e)}'}
+
+@container_bp.route('/nodes')
+@admin_required
+def nodes():
+    return {'success': True, 'nodes': node_registry.snapshot()}
+
+@container_bp.route('/terminal/stats')
+@admin_required
+def terminal_stats():
+    return {'success': True, 'startup': terminal_startup.summary()}
+
 @container_bp.route('/<int:cont_id>/stat')
 def stat(cont_id):
     user_id = get_user_id()
@@ -126,25 +133,31 @@ def stat(cont_id):
     if not cont or (not is_admin and cont.user_id != user_id):
         flash('无权限')
         return redirect(url_for('container.get_list'))
-    try:
-        docker_cont = docker_client.containers.get(cont.docker_id)
-        stats = docker_cont.stats(stream=False)
-        cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - stats['precpu_stats']['cpu_usage']['total_usage']
-        system_cpu_delta = stats['cpu_stats']['system_cpu_usage'] - stats['precpu_stats']['system_cpu_usage']
-        cpu_count = len(stats['cpu_stats']['cpu_usage'].get('percpu_usage', []))
-        cpu_percent = (cpu_delta / system_cpu_delta) * cpu_count * 100.0 if system_cpu_delta > 0 else 0.0
-        mem_usage = stats['memory_stats']['usage']
-        mem_limit = stats['memory_stats']['limit']
-        mem_percent = (mem_usage / mem_limit) * 100.0 if mem_limit > 0 else 0.0
-        return {
-            'success': True,
-            'cpu_percent': round(cpu_percent, 2),
-            'mem_usage': mem_usage,
-            'mem_limit': mem_limit,
-            'mem_percent': round(mem_percent, 2)
-        }
-    except Exception as e:
-        return {'error': str(e)}
+    stats = stats_cache.get(cont.docker_id, cont.node)
+    if stats is None:
+        return {'error': '暂无统计数据'}
+    result = {'success': True}
+    result.update(stats)
+    return result
+
+@container_bp.route('/<int:cont_id>/stats/history')
+def stats_history(cont_id):
+    user_id = get_user_id()
+    is_admin = 'admin' in session
+
+    cont = Container.query.filter_by(id=cont_id).filter(Container.status != 'removed').first()
+    if not cont or (not is_admin and cont.user_id != user_id):
+        return {'success': False, 'message': '无权限'}
+
+    start = request.args.get('from', int(time.time()) - 600, type=int)
+    step = max(request.args.get('step', 5, type=int), 1)
+    history = metrics_store.get(cont.docker_id)
+    return {
+        'success': True,
+        'step': step,
+        'fields': ['timestamp', 'cpu_percent', 'mem_usage', 'net_rx', 'net_tx', 'blk_read', 'blk_write'],
+        'points': history.query(start, step) if history else []
+    }
     
 @container_bp.route('/<int:cont_id>/overview')
 def overview(cont_id):
@@ -158,7 +171,7 @@ def overview(cont_id):
     
     # 获取容器的网络信息
     try:
-        docker_cont = docker_client.containers.get(cont["docker_id"])
+        docker_cont = node_registry.client(cont["node"]).containers.get(cont["docker_id"])
         net_info = docker_cont.attrs['NetworkSettings']
         cont = dict(cont)
         cont['ip_address'] = net_info['IPAddress']
@@ -173,7 +186,7 @@ def overview(cont_id):
     return render_template(
         'container/overview.html', 
         container=cont, 
-        host_ip=current_app.config["HOST_IP"], 
+        host_ip=node_registry.get(cont["node"]).host_ip, 
         is_admin=is_admin
     )
 
@@ -190,7 +203,7 @@ def logs(cont_id):
     return render_template(
         'container/logs.html', 
         container=cont, 
-        host_ip=current_app.config["HOST_IP"], 
+        host_ip=node_registry.get(cont["node"]).host_ip, 
         is_admin=is_admin
     )
 
@@ -208,7 +221,7 @@ def terminal(cont_id):
         'container/terminal.html', 
         container=cont, 
         is_admin=is_admin, 
-        host_ip=current_app.config["HOST_IP"]
+        host_ip=node_registry.get(cont["node"]).host_ip
     )
 
 @container_bp.route('/<int:cont_id>/files')
@@ -221,9 +234,9 @@ def files(cont_id):
         flash('无权限')
         return redirect(url_for('container.get_list'))
     
-    container = docker_client.containers.get(cont["docker_id"])
+    container = node_registry.client(cont["node"]).containers.get(cont["docker_id"])
     workdir = container.attrs['Config']['WorkingDir'] or '/'
-    return render_template('container/files.html', container=cont, current_path=workdir, host_ip=current_app.config["HOST_IP"], is_admin=is_admin)
+    return render_template('container/files.html', container=cont, current_path=workdir, host_ip=node_registry.get(cont["node"]).host_ip, is_admin=is_admin)
 
 @container_bp.route('/<int:cont_id>/files/<action>', methods=['GET', 'POST'])
 def files_action(cont_id, action):
@@ -238,8 +251,13 @@ def files_action(cont_id, action):
         }
     
     try:
+        # 文件管理直接读写主机上的容器文件系统，只支持与本服务在同一台主机上的节点
+        node = node_registry.get(cont["node"])
+        if not node.is_local:
+            raise Exception(f"容器所在节点 {node.name} 不支持文件管理")
+
         # 获取容器详细信息
-        container = docker_client.containers.get(cont["docker_id"])
+        container = node.client.containers.get(cont["docker_id"])
         path = request.args.get('path', '/')
         if not path.startswith('/'):
             path = '/' + path
@@ -266,33 +284,18 @@ def files_action(cont_id, action):
             raise Exception(f"容器内路径不是目录: {path}")
         
         if action == 'get_list':
-            files = []
-            for entry in os.scandir(host_path):
-                # 跳过特殊目录
-                if entry.name in ('.', '..'):
-                    continue
-                    
-                # 获取文件类型
-                try:
-                    entry_type = 'dir' if entry.is_dir() else 'file'
-                
-                    # 获取创建时间
-                    stat_info = entry.stat()
-                    created_time = datetime.fromtimestamp(stat_info.st_ctime)
-                    
-                    files.append({
-                        'type': entry_type,
-                        'name': entry.name,
-                        'size': stat_info.st_size,
-                        'created_time': created_time
-                    })
-                except Exception as e:
-                    pass
-            files.sort(key=lambda x: (x['type'] != 'dir', x['name'].lower()))
-            return {
-                'success': True,
-                'files': files
-            }
+            # 游标分页，大目录也只 stat 当前页的条目；q 按名称过滤，sort 可选 name / size / created_time
+            limit = request.args.get('limit', LIST_PAGE_SIZE, type=int)
+            result = list_directory(
+                host_path,
+                cursor=request.args.get('cursor') or None,
+                limit=min(max(limit, 1), LIST_MAX_PAGE_SIZE),
+                sort=request.args.get('sort', 'name'),
+                order=request.args.get('order', 'asc'),
+                query=request.args.get('q', '').strip()
+            )
+            result['success'] = True
+            return result
         elif action == 'download' or action == 'view':
             filename = request.args.get('file')
             if not filename:
@@ -327,16 +330,28 @@ def files_action(cont_id, action):
                     'content_base64': encoded_content
                 }
             else:  # download
-                def generate():
-                    with open(file_path, 'rb') as f:
-                        while True:
-                            chunk = f.read(4096)
-                            if not chunk:
-                                break
-                            yield chunk
-                response = current_app.response_class(generate(), mimetype='application/octet-stream')
-                response.headers.set('Content-Disposition', 'attachment', filename=filename)
-                response.headers.set('Content-Length', os.path.getsize(file_path))
+                # 容器内的绝对路径符号链接在主机上会指向主机文件，解析后仍须位于容器文件系统内
+                real_mount = os.path.realpath(overlay_mount)
+                if not os.path.realpath(file_path).startswith(real_mount + os.sep):
+                    return {
+                        'success': False,
+                        'message': '文件不存在'
+                    }
+                # send_file 交给 WSGI 服务器的 file_wrapper（gunicorn 等使用 sendfile 零拷贝），
+                # 并处理 Range 断点续传和 ETag / Last-Modified 条件请求
+                try:
+                    response = send_file(
+                        file_path,
+                        mimetype='application/octet-stream',
+                        as_attachment=True,
+                        download_name=filename,
+                        conditional=True,
+                        etag=True,
+                        max_age=0
+                    )
+                except RequestedRangeNotSatisfiable as e:
+                    return e.get_response()
+                response.cache_control.private = True
                 return response
 
         if request.method == "POST":
@@ -487,20 +502,25 @@ def manage(cont_id, action):
         return {'success': False, 'message': '无权限'}
 
     try:
-        docker_cont = docker_client.containers.get(cont.docker_id)
+        docker_cont = node_registry.client(cont.node).containers.get(cont.docker_id)
         if action == 'start':
             docker_cont.start()
+            old_status = cont.status
             cont.status = docker_cont.status
             db.session.commit()
+            dashboard_counters.status_changed(old_status, cont.status)
 
         elif action == 'stop':
             docker_cont.stop()
+            old_status = cont.status
             cont.status = docker_cont.status
             db.session.commit()
+            dashboard_counters.status_changed(old_status, cont.status)
 
         elif action == 'remove':
-            cont.status = 'removed'
-            db.session.commit()
+            if not mark_removed(cont):
+                return {'success': False, 'message': '容器已被删除'}
+            expiry_scheduler.cancel(cont.id)
             docker_cont.remove(force=True)
         elif action == 'extend':
             remaining = cont.destroy_time - datetime.now()
@@ -509,7 +529,7 @@ def manage(cont_id, action):
                     'success': False,
                     'message': '只有剩余时间少于20分钟才能延长'
                 }
-            if cont['extended_times'] >= 2:
+            if cont.extended_times >= 2:
                 return {
                     'success': False,
                     'message': '每个容器最多只能延长2次'
@@ -518,6 +538,7 @@ def manage(cont_id, action):
             cont.destroy_time = new_destroy_time
             cont.extended_times += 1
             db.session.commit()
+            expiry_scheduler.schedule(cont.id, new_destroy_time)
 
             log_action(f'Extend container {cont.docker_id}', user_id)
             
@@ -1,20 +1,46 @@
+from datetime import datetime
 from flask import Blueprint, render_template, request, session
 from models.log import Log
 from utils.auth import admin_required
+from utils.pagination import keyset_paginate, cached_count
 
 logs_bp = Blueprint('logs', __name__, url_prefix='/logs')
 
+def parse_time(value):
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
 @logs_bp.route('/list')
 @admin_required
 def logs_list():
-    page = request.args.get('page', 1, type=int)
     per_page = 20
-    offset = (page - 1) * per_page
-    
-    logs_query = Log.query.order_by(Log.id.desc())
-    total_logs = logs_query.count()
-    logs = logs_query.offset(offset).limit(per_page).all()
+    before = request.args.get('before', type=int)
+    after = request.args.get('after', type=int)
+
+    # 过滤条件：用户、操作前缀、时间范围
+    filters = {
+        'user_id': request.args.get('user_id', '').strip(),
+        'action': request.args.get('action', '').strip(),
+        'start': request.args.get('start', '').strip(),
+        'end': request.args.get('end', '').strip(),
+    }
+    logs_query = Log.query
+    if filters['user_id']:
+        logs_query = logs_query.filter(Log.user_id == filters['user_id'])
+    if filters['action']:
+        logs_query = logs_query.filter(Log.action.startswith(filters['action'], autoescape=True))
+    start = parse_time(filters['start'])
+    if start:
+        logs_query = logs_query.filter(Log.timestamp >= start)
+    end = parse_time(filters['end'])
+    if end:
+        logs_query = logs_query.filter(Log.timestamp < end)
+
+    page = keyset_paginate(logs_query, Log.id, per_page, before=before, after=after)
+    total_logs = cached_count(('logs',) + tuple(filters.values()), logs_query)
+    filters = {k: v for k, v in filters.items() if v}
 
-    total_pages = (total_logs - 1) // per_page + 1
     is_admin = 'admin' in session
-    return render_template('logs/list.html', logs=logs, per_page=per_page, current_page=page, total_items=total_logs, total_pages=total_pages, is_admin=is_admin)
\ No newline at end of file
+    return render_template('logs/list.html', logs=page['items'], page=page, filters=filters, total_items=total_logs, is_admin=is_admin)
\ No newline at end of file
@@ -1,23 +1,66 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+import hashlib
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, make_response, current_app
 from models.template import Template
 from models import db
 from utils.auth import admin_required
 from utils.logger import log_action
+from utils.warm_pool import warm_pool
+from utils.counters import dashboard_counters
+from utils.catalog import template_catalog
+from utils.images import image_manager
+from models.image import Image
 
 template_bp = Blueprint('template', __name__, url_prefix='/template')
 
+_page_version = None
+
+def page_version():
+    """页面模板内容的摘要，部署新版本后旧的 ETag 随之失效"""
+    global _page_version
+    if _page_version is None:
+        digest = hashlib.sha1()
+        for name in ('base.html', 'template/market.html'):
+            source, _, _ = current_app.jinja_loader.get_source(current_app.jinja_env, name)
+            digest.update(source.encode('utf-8'))
+        _page_version = digest.hexdigest()[:12]
+    return _page_version
+
+def not_modified(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
 @template_bp.route('/market')
 def market():
     is_admin = 'admin' in session
-    templates = Template.query.all()
-    templates_list = [t.to_dict() for t in templates]
-    return render_template('template/market.html', templates=templates_list, is_admin=is_admin)
+    templates_list, _, etag = template_catalog.snapshot()
+    # 页面还取决于是否为管理员；有待显示的提示消息时不做条件请求
+    etag = f'{etag}-{page_version()}-{int(is_admin)}'
+    cacheable = '_flashes' not in session
+    if cacheable and request.if_none_match.contains(etag):
+        return not_modified(etag)
+
+    response = make_response(render_template('template/market.html', templates=templates_list, is_admin=is_admin))
+    if cacheable:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@template_bp.route('/catalog')
+def catalog():
+    _, body, etag = template_catalog.snapshot()
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @template_bp.route('/list')
 @admin_required
 def get_list():
     is_admin = 'admin' in session
-    templates = Template.query.all()
+    templates, _, _ = template_catalog.snapshot()
     return render_template('template/list.html', templates=templates, is_admin=is_admin)
 
 @template_bp.route('/add', methods=['GET', 'POST'])
@@ -35,11 +78,17 @@ def add():
                 disk_limit = request.form['disk_limit'],
                 command = request.form.get('command', ''),
                 available_command = request.form.get('available_command', '/bin/sh'),
-                container_port = int(request.form['container_port'])
+                container_port = int(request.form['container_port']),
+                pool_size = int(request.form.get('pool_size') or 0)
             )
 
             db.session.add(template)
             db.session.commit()
+            dashboard_counters.template_added()
+            template_catalog.invalidate()
+            image_manager.ensure(template.image)
+            if template.pool_size:
+                warm_pool.refill_event.set()
         
             log_action('Create template', session['admin'])
             flash('模板创建成功')
@@ -62,9 +111,23 @@ def delete():
         
         db.session.delete(template)
         db.session.commit()
+        dashboard_counters.template_added(-1)
+        template_catalog.invalidate()
+        warm_pool.refill_event.set()
+        image_manager.request_gc()
 
         log_action(f'Delete template {temp_id}', session['admin'])
         return {'success': True, 'message': '删除成功', 'redirect': url_for('template.get_list')}
     except Exception as e:
         db.session.rollback()
-        return {'success': False, 'message': f'删除失败: {str(e)}'}
\ No newline at end of file
+        return {'success': False, 'message': f'删除失败: {str(e)}'}
+
+@template_bp.route('/pool/stats')
+@admin_required
+def pool_stats():
+    return {'success': True, 'pools': warm_pool.snapshot()}
+
+@template_bp.route('/images')
+@admin_required
+def images():
+    return {'success': True, 'images': [i.to_dict() for i in Image.query.order_by(Image.id).all()]}
@@ -7,6 +7,16 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', os.urandom(24))
     HOST_IP = os.environ.get('HOST_IP', '127.0.0.1')
     MAX_EDIT_SIZE = int(os.environ.get('MAX_EDIT_SIZE', 100 * 1024))
+    # 为所有运行中的容器持续采集资源历史（每个容器一条常驻 stats 连接，不受无人查看时关闭的限制），默认关闭
+    STATS_HISTORY = os.environ.get('STATS_HISTORY', '0') == '1'
+    # 数据库不可用时审计日志暂存的文件
+    AUDIT_SPILL_FILE = os.environ.get('AUDIT_SPILL_FILE', 'audit_spill.jsonl')
+    # Docker 节点列表，格式 "名称|地址|对外IP,..."，例如 "local|unix:///var/run/docker.sock|1.2.3.4,node2|tcp://10.0.0.2:2375|5.6.7.8"
+    # 为空时只使用本机 Docker（按 DOCKER_HOST 等环境变量连接），对外 IP 省略时使用 HOST_IP
+    DOCKER_NODES = os.environ.get('DOCKER_NODES', '')
+    # 每个节点上自动分配给容器的主机端口范围（含两端）
+    PORT_RANGE_START = int(os.environ.get('PORT_RANGE_START', 30000))
+    PORT_RANGE_END = int(os.environ.get('PORT_RANGE_END', 39999))
 
     DB_HOST = os.environ.get('DB_HOST', 'localhost')
     DB_USER = os.environ.get('DB_USER', 'root')
@@ -14,7 +24,8 @@ class Config:
     DB_NAME = os.environ.get('DB_NAME', 'docker_run')
     DB_PORT = int(os.environ.get('DB_PORT', 3306))
 
-    SQLALCHEMY_DATABASE_URI = (
+    # 设置 DATABASE_URL 时直接使用该连接串（例如压测时的 SQLite 数据库），忽略上面的 DB_* 配置
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or (
         f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     )
     SQLALCHEMY_ENGINE_OPTIONS = {
@@ -0,0 +1,83 @@
+"""baseline schema
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17 10:00:00
+
+已有数据库（由 db.create_all() 建出）先执行 `flask db stamp 0001_baseline` 再升级。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'admins',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('username', sa.String(length=255), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_table(
+        'templates',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('name', sa.String(length=255), nullable=True),
+        sa.Column('image', sa.String(length=255), nullable=True),
+        sa.Column('cpu_limit', sa.String(length=50), nullable=True),
+        sa.Column('mem_limit', sa.String(length=50), nullable=True),
+        sa.Column('disk_limit', sa.String(length=50), nullable=True),
+        sa.Column('command', sa.Text(), nullable=True),
+        sa.Column('available_command', sa.Text(), nullable=True),
+        sa.Column('tags', sa.Text(), nullable=True),
+        sa.Column('container_port', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'containers',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=True),
+        sa.Column('user_id', sa.String(length=255), nullable=True),
+        sa.Column('template_id', sa.Integer(), nullable=True),
+        sa.Column('docker_id', sa.String(length=255), nullable=True),
+        sa.Column('host_port', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('extended_times', sa.Integer(), nullable=True),
+        sa.Column('destroy_time', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['template_id'], ['templates.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'logs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.String(length=255), nullable=True),
+        sa.Column('action', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'system_settings',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('value', sa.Text(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_system_settings_key', 'system_settings', ['key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_system_settings_key', table_name='system_settings')
+    op.drop_table('system_settings')
+    op.drop_table('logs')
+    op.drop_table('containers')
+    op.drop_table('templates')
+    op.drop_table('admins')
@@ -0,0 +1,56 @@
+"""warm pool size, quota ledger and log indexes
+
+Revision ID: 0002_pool_quota_log_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17 10:05:00
+
+启动时的 db.create_all() 可能已经建出 quotas 表，这里逐项检查后再创建。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_pool_quota_log_indexes'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def _has_index(table, name):
+    return any(ix['name'] == name for ix in _inspector().get_indexes(table))
+
+
+def upgrade():
+    inspector = _inspector()
+    if 'pool_size' not in [c['name'] for c in inspector.get_columns('templates')]:
+        op.add_column('templates', sa.Column('pool_size', sa.Integer(), nullable=True, server_default='0'))
+
+    if not inspector.has_table('quotas'):
+        op.create_table(
+            'quotas',
+            sa.Column('user_id', sa.String(length=255), nullable=False),
+            sa.Column('used', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('max_containers', sa.Integer(), nullable=True),
+            sa.PrimaryKeyConstraint('user_id')
+        )
+
+    if not _has_index('logs', 'ix_logs_user_id_id'):
+        op.create_index('ix_logs_user_id_id', 'logs', ['user_id', 'id'])
+    if not _has_index('logs', 'ix_logs_action'):
+        op.create_index('ix_logs_action', 'logs', ['action'], mysql_length=64)
+    if not _has_index('logs', 'ix_logs_timestamp'):
+        op.create_index('ix_logs_timestamp', 'logs', ['timestamp'])
+
+
+def downgrade():
+    op.drop_index('ix_logs_timestamp', table_name='logs')
+    op.drop_index('ix_logs_action', table_name='logs')
+    op.drop_index('ix_logs_user_id_id', table_name='logs')
+    op.drop_table('quotas')
+    with op.batch_alter_table('templates') as batch_op:
+        batch_op.drop_column('pool_size')
@@ -0,0 +1,48 @@
+"""container indexes for the hot query paths
+
+Revision ID: 0003_container_indexes
+Revises: 0002_pool_quota_log_indexes
+Create Date: 2026-10-17 10:10:00
+
+- (user_id, status)：按用户统计 / 列出未删除的容器
+- (status, destroy_time)：过期调度、状态同步按状态扫描
+- docker_id 唯一：事件同步、stats、终端都按 docker_id 查找
+- ix_containers_active (user_id, id)：容器列表的游标分页。PostgreSQL / SQLite 上是
+  只包含 status != 'removed' 的部分索引；MySQL 不支持部分索引，建成普通联合索引
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_container_indexes'
+down_revision = '0002_pool_quota_log_indexes'
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text("status != 'removed'")
+
+
+def _has_index(table, name):
+    return any(ix['name'] == name for ix in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade():
+    if not _has_index('containers', 'ix_containers_user_id_status'):
+        op.create_index('ix_containers_user_id_status', 'containers', ['user_id', 'status'])
+    if not _has_index('containers', 'ix_containers_status_destroy_time'):
+        op.create_index('ix_containers_status_destroy_time', 'containers', ['status', 'destroy_time'])
+    if not _has_index('containers', 'ux_containers_docker_id'):
+        op.create_index('ux_containers_docker_id', 'containers', ['docker_id'], unique=True)
+    if not _has_index('containers', 'ix_containers_active'):
+        op.create_index(
+            'ix_containers_active', 'containers', ['user_id', 'id'],
+            postgresql_where=ACTIVE, sqlite_where=ACTIVE
+        )
+
+
+def downgrade():
+    op.drop_index('ix_containers_active', table_name='containers')
+    op.drop_index('ux_containers_docker_id', table_name='containers')
+    op.drop_index('ix_containers_status_destroy_time', table_name='containers')
+    op.drop_index('ix_containers_user_id_status', table_name='containers')
@@ -0,0 +1,41 @@
+"""image pre-pull tracking
+
+Revision ID: 0004_images
+Revises: 0003_container_indexes
+Create Date: 2026-10-17 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_images'
+down_revision = '0003_container_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('images'):
+        return
+    op.create_table(
+        'images',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('digest', sa.String(length=255), nullable=True),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('layers', sa.Text(), nullable=True),
+        sa.Column('bytes_done', sa.BigInteger(), nullable=True),
+        sa.Column('bytes_total', sa.BigInteger(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('pulled_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('images')
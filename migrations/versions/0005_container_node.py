@@ -0,0 +1,31 @@
+"""docker node of each container
+
+Revision ID: 0005_container_node
+Revises: 0004_images
+Create Date: 2026-10-17 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_container_node'
+down_revision = '0004_images'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'node' not in [c['name'] for c in inspector.get_columns('containers')]:
+        # 已有容器都在原来唯一的本机节点上
+        op.add_column('containers', sa.Column('node', sa.String(length=64), nullable=True, server_default='local'))
+    if not any(ix['name'] == 'ix_containers_node_status' for ix in inspector.get_indexes('containers')):
+        op.create_index('ix_containers_node_status', 'containers', ['node', 'status'])
+
+
+def downgrade():
+    op.drop_index('ix_containers_node_status', table_name='containers')
+    with op.batch_alter_table('containers') as batch_op:
+        batch_op.drop_column('node')
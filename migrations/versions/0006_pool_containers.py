@@ -0,0 +1,40 @@
+"""warm pool containers shared by all workers
+
+Revision ID: 0006_pool_containers
+Revises: 0005_container_node
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_pool_containers'
+down_revision = '0005_container_node'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('pool_containers'):
+        return
+    op.create_table(
+        'pool_containers',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('docker_id', sa.String(length=255), nullable=False),
+        sa.Column('template_id', sa.Integer(), nullable=False),
+        sa.Column('node', sa.String(length=64), nullable=True),
+        sa.Column('host_port', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('docker_id')
+    )
+    op.create_index('ix_pool_containers_template_status', 'pool_containers', ['template_id', 'status'])
+
+
+def downgrade():
+    op.drop_index('ix_pool_containers_template_status', table_name='pool_containers')
+    op.drop_table('pool_containers')
@@ -1,5 +1,7 @@
+import os
+import sys
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_migrate import Migrate, stamp
 
 db = SQLAlchemy()
 migrate = None
@@ -7,11 +9,34 @@ migrate = None
 def init_db(app):
     global migrate
     db.init_app(app)
-    migrate = Migrate(app, db)
+    migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations'))
 
     with app.app_context():
         from models.admin import init_admin
         from models.settings import initialize_default_settings
+        # 全新数据库由 create_all 建到最新结构并直接标记版本，已有数据库用 flask db upgrade 升级
+        inspector = db.inspect(db.engine)
+        fresh = not inspector.has_table('containers')
         db.create_all()
+        if fresh:
+            stamp()
+        elif not inspector.has_table('alembic_version'):
+            print("Database has no migration version, run `flask db stamp 0001_baseline && flask db upgrade`.")
         init_admin()
         initialize_default_settings()
+
+def is_migration_command():
+    """当前进程是否是 flask db ... 命令，此时只加载应用，不启动后台任务"""
+    return os.path.basename(sys.argv[0]).startswith('flask') and 'db' in sys.argv[1:]
+
+def schema_ready():
+    """数据库是否已迁移到最新版本，需要在应用上下文中调用"""
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    with db.engine.connect() as conn:
+        current = set(MigrationContext.configure(conn).get_current_heads())
+    heads = set(ScriptDirectory.from_config(migrate.get_config()).get_heads())
+    if current != heads:
+        print(f"Database revision {sorted(current) or 'none'} is not {sorted(heads)}, run `flask db upgrade`.")
+        return False
+    return True
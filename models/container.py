@@ -2,6 +2,16 @@ from models import db
 
 class Container(db.Model):
     __tablename__ = 'containers'
+    __table_args__ = (
+        # 与 migrations/versions/0003_container_indexes.py 保持一致
+        db.Index('ix_containers_user_id_status', 'user_id', 'status'),
+        db.Index('ix_containers_status_destroy_time', 'status', 'destroy_time'),
+        db.Index('ux_containers_docker_id', 'docker_id', unique=True),
+        db.Index('ix_containers_active', 'user_id', 'id',
+                 postgresql_where=db.text("status != 'removed'"),
+                 sqlite_where=db.text("status != 'removed'")),
+        db.Index('ix_containers_node_status', 'node', 'status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(255))
@@ -12,6 +22,8 @@ class Container(db.Model):
     status = db.Column(db.String(50))
     extended_times = db.Column(db.Integer, default=0)
     destroy_time = db.Column(db.DateTime)
+    # 所在 Docker 节点的名称，见 utils/nodes.py
+    node = db.Column(db.String(64), default='local')
 
     @classmethod
     def get_with_template_info(cls, cont_id):
@@ -64,4 +76,5 @@ class Container(db.Model):
             'status': self.status,
             'extended_times': self.extended_times,
             'destroy_time': self.destroy_time,
+            'node': self.node,
         }
\ No newline at end of file
@@ -0,0 +1,70 @@
+import json
+from datetime import datetime, timedelta
+from models import db
+
+# 超过这个时间仍处于 pulling 的记录视为拉取进程已退出，可以被重新认领
+PULL_CLAIM_TIMEOUT = timedelta(minutes=15)
+
+class Image(db.Model):
+    __tablename__ = 'images'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # 与 Template.image 相同的镜像名称
+    name = db.Column(db.String(255), unique=True, nullable=False)
+    # pending / pulling / ready / failed
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    digest = db.Column(db.String(255))
+    size = db.Column(db.BigInteger)
+    # {layer_id: 字节数}
+    layers = db.Column(db.Text)
+    bytes_done = db.Column(db.BigInteger, default=0)
+    bytes_total = db.Column(db.BigInteger, default=0)
+    error = db.Column(db.Text)
+    pulled_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.now)
+
+    @classmethod
+    def get_or_create(cls, name):
+        image = cls.query.filter_by(name=name).first()
+        if image is None:
+            image = cls(name=name, status='pending')
+            db.session.add(image)
+            try:
+                db.session.commit()
+            except Exception:
+                # 其他进程同时创建了同名记录
+                db.session.rollback()
+                image = cls.query.filter_by(name=name).first()
+        return image
+
+    @classmethod
+    def claim(cls, name):
+        """把记录标记为 pulling，返回是否由本进程负责这次拉取"""
+        now = datetime.now()
+        count = cls.query.filter(
+            cls.name == name,
+            db.or_(cls.status != 'pulling', cls.updated_at < now - PULL_CLAIM_TIMEOUT)
+        ).update({'status': 'pulling', 'updated_at': now, 'error': None}, synchronize_session=False)
+        db.session.commit()
+        return count == 1
+
+    @classmethod
+    def is_ready(cls, name):
+        image = cls.query.filter_by(name=name).first()
+        return image is not None and image.pulled_at is not None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'digest': self.digest,
+            'size': self.size,
+            'layers': json.loads(self.layers) if self.layers else {},
+            'bytes_done': self.bytes_done,
+            'bytes_total': self.bytes_total,
+            'progress': round(self.bytes_done / self.bytes_total, 4) if self.bytes_total else None,
+            'error': self.error,
+            'pulled_at': self.pulled_at,
+            'updated_at': self.updated_at,
+        }
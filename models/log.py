@@ -3,6 +3,12 @@ from datetime import datetime
 
 class Log(db.Model):
     __tablename__ = 'logs'
+    __table_args__ = (
+        # 日志列表按 id 倒序翻页，并可按用户、操作前缀、时间过滤
+        db.Index('ix_logs_user_id_id', 'user_id', 'id'),
+        db.Index('ix_logs_action', 'action', mysql_length=64),
+        db.Index('ix_logs_timestamp', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.String(255))
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from models import db
+
+# 认领后超过这个时间仍未交给用户或删除，视为认领的进程已退出，放回空闲
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+class PoolContainer(db.Model):
+    """预热池中的一个容器。
+
+    多个 worker 进程共用这张表：取用、回收都先用带条件的 UPDATE 把 idle 改为 claimed，
+    只有 rowcount 为 1 的进程继续操作这个容器。
+    """
+    __tablename__ = 'pool_containers'
+    __table_args__ = (
+        db.Index('ix_pool_containers_template_status', 'template_id', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    docker_id = db.Column(db.String(255), unique=True, nullable=False)
+    template_id = db.Column(db.Integer, nullable=False)
+    node = db.Column(db.String(64))
+    host_port = db.Column(db.Integer)
+    # idle / claimed
+    status = db.Column(db.String(20), nullable=False, default='idle')
+    claimed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+    @classmethod
+    def _claim_row(cls, row_id):
+        count = cls.query.filter(cls.id == row_id, cls.status == 'idle')\
+            .update({'status': 'claimed', 'claimed_at': datetime.now()}, synchronize_session=False)
+        db.session.commit()
+        return count == 1
+
+    @classmethod
+    def claim(cls, template_id):
+        """认领模板的一个空闲容器，没有时返回 None"""
+        while True:
+            row = cls.query.filter_by(template_id=template_id, status='idle').order_by(cls.id).first()
+            if row is None:
+                db.session.commit()
+                return None
+            if cls._claim_row(row.id):
+                return row
+
+    @classmethod
+    def claim_surplus(cls, template_id, keep):
+        """认领超出 keep 个的空闲容器，用于回收"""
+        rows = cls.query.filter_by(template_id=template_id, status='idle')\
+            .order_by(cls.id).offset(keep).all()
+        return [row for row in rows if cls._claim_row(row.id)]
+
+    @classmethod
+    def idle_counts(cls):
+        """template_id -> 空闲容器数"""
+        return dict(
+            db.session.query(cls.template_id, db.func.count(cls.id))
+            .filter(cls.status == 'idle')
+            .group_by(cls.template_id)
+            .all()
+        )
+
+    @classmethod
+    def reclaim_stale(cls):
+        cls.query.filter(cls.status == 'claimed', cls.claimed_at < datetime.now() - CLAIM_TIMEOUT)\
+            .update({'status': 'idle', 'claimed_at': None}, synchronize_session=False)
+        db.session.commit()
+
+    def unclaim(self):
+        self.status = 'idle'
+        self.claimed_at = None
+        db.session.commit()
+
+    def entry(self):
+        return {'docker_id': self.docker_id, 'host_port': self.host_port, 'node': self.node}
@@ -0,0 +1,93 @@
+from sqlalchemy.exc import IntegrityError
+from models import db
+
+# 全局已用数量记录在这一行
+TOTAL_KEY = '__total__'
+
+class Quota(db.Model):
+    __tablename__ = 'quotas'
+
+    user_id = db.Column(db.String(255), primary_key=True)
+    used = db.Column(db.Integer, nullable=False, default=0)
+    # 单独为某个用户设置的容器上限，为空时使用 MAX_PER_USER
+    max_containers = db.Column(db.Integer)
+
+    @classmethod
+    def _locked(cls, user_id):
+        row = cls.query.filter_by(user_id=user_id).with_for_update().first()
+        if row is None:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(cls(user_id=user_id, used=0))
+            except IntegrityError:
+                pass
+            row = cls.query.filter_by(user_id=user_id).with_for_update().first()
+        return row
+
+    @classmethod
+    def reserve(cls, user_id):
+        """占用一个容器名额，返回 (是否成功, 提示信息)"""
+        from utils.settings import get_setting
+        max_per_user = get_setting('MAX_PER_USER', default=3, type_cast=int)
+        max_total = get_setting('MAX_TOTAL', default=20, type_cast=int)
+        try:
+            # 固定先锁全局行再锁用户行，避免死锁
+            total = cls._locked(TOTAL_KEY)
+            user = cls._locked(user_id)
+            user_limit = user.max_containers if user.max_containers is not None else max_per_user
+            if user.used >= user_limit:
+                db.session.rollback()
+                return False, f'每个用户最多 {user_limit} 个容器'
+            if total.used >= max_total:
+                db.session.rollback()
+                return False, '总容器数已达上限'
+            user.used += 1
+            total.used += 1
+            db.session.commit()
+            return True, ''
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @classmethod
+    def release(cls, user_id):
+        """释放一个容器名额，在容器创建失败或变为 removed 时调用"""
+        try:
+            total = cls._locked(TOTAL_KEY)
+            user = cls._locked(user_id)
+            user.used = max(user.used - 1, 0)
+            total.used = max(total.used - 1, 0)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Failed to release quota for {user_id}: {e}")
+
+    @classmethod
+    def set_limit(cls, user_id, max_containers):
+        user = cls._locked(user_id)
+        user.max_containers = max_containers
+        db.session.commit()
+        return user
+
+def initialize_quotas():
+    """启动时按 containers 表重新统计已用名额"""
+    from models.container import Container
+    usage = dict(
+        db.session.query(Container.user_id, db.func.count(Container.id))
+        .filter(Container.status != 'removed')
+        .group_by(Container.user_id)
+        .all()
+    )
+    rows = {q.user_id: q for q in Quota.query.all()}
+    for user_id, row in rows.items():
+        if user_id != TOTAL_KEY:
+            row.used = usage.get(user_id, 0)
+    for user_id, used in usage.items():
+        if user_id not in rows:
+            db.session.add(Quota(user_id=user_id, used=used))
+    total = rows.get(TOTAL_KEY)
+    if total is None:
+        db.session.add(Quota(user_id=TOTAL_KEY, used=sum(usage.values())))
+    else:
+        total.used = sum(usage.values())
+    db.session.commit()
@@ -21,6 +21,8 @@ class SystemSettings(db.Model):
             setting = cls(key=key, value=value)
             db.session.add(setting)
         db.session.commit()
+        from utils.settings import settings_cache
+        settings_cache.invalidate()
         return setting
 
     def to_dict(self):
@@ -32,6 +34,8 @@ class SystemSettings(db.Model):
     
 default_settings = [
     {'key':'MAX_EDIT_SIZE', 'value':"102400", "decription": "最大编辑大小(单位：字节)"},
+    {'key':'MAX_PER_USER', 'value':"3", "description": "每个用户最多同时存在的容器数"},
+    {'key':'MAX_TOTAL', 'value':"20", "description": "全站最多同时存在的容器数"},
 ]
 
 def initialize_default_settings():
@@ -14,6 +14,7 @@ class Template(db.Model):
     available_command = db.Column(db.Text)
     tags = db.Column(db.Text)
     container_port = db.Column(db.Integer)
+    pool_size = db.Column(db.Integer, default=0)
 
     containers = db.relationship('Container', backref='template', lazy=True)
 
@@ -23,7 +24,7 @@ class Template(db.Model):
 
     @classmethod
     def create_template(cls, description, name, image, cpu_limit, mem_limit,
-                        disk_limit, command, available_command, tags, container_port):
+                        disk_limit, command, available_command, tags, container_port, pool_size=0):
         template = cls(
             description=description,
             name=name,
@@ -34,7 +35,8 @@ class Template(db.Model):
             command=command,
             available_command=available_command,
             tags=tags,
-            container_port=container_port
+            container_port=container_port,
+            pool_size=pool_size
         )
         db.session.add(template)
         db.session.commit()
@@ -52,5 +54,6 @@ class Template(db.Model):
             'command': self.command,
             'available_command': self.available_command,
             'tags': self.tags,
-            'container_port': self.container_port
+            'container_port': self.container_port,
+            'pool_size': self.pool_size
         }
\ No newline at end of file
@@ -0,0 +1,22 @@
+from flask import session, request
+from flask_socketio import Namespace, join_room
+from utils.auth import get_user_id
+from utils.jobs import creation_jobs
+
+class ContainerJobsNamespace(Namespace):
+    def __init__(self, namespace=None):
+        super().__init__(namespace)
+        # 创建任务的状态变化推送到以 job_id 命名的房间
+        creation_jobs.namespace = self
+
+    def on_connect(self):
+        pass
+
+    def on_watch_job(self, data):
+        job = creation_jobs.get(data.get('job_id'))
+        if not job or ('admin' not in session and job['user_id'] != get_user_id()):
+            self.emit('job_status', {'status': 'failed', 'message': '任务不存在'}, room=request.sid)
+            return
+        join_room(job['id'])
+        # 订阅前可能已经有状态变化，先推送一次当前状态
+        self.emit('job_status', job, room=request.sid)
@@ -1,11 +1,15 @@
-from flask import session
+from flask import session, request
 from flask_socketio import Namespace, disconnect
-from utils.docker import docker_client
 from utils.auth import get_user_id
 from models.container import Container
-from docker.errors import NotFound
+from sockets.log_hub import LogHub
 
 class ContainerLogsNamespace(Namespace):
+    def __init__(self, namespace=None):
+        super().__init__(namespace)
+        # 同一容器的所有查看者共享一条日志流
+        self.log_hub = LogHub(self)
+
     def on_connect(self):
         pass
 
@@ -15,20 +19,17 @@ class ContainerLogsNamespace(Namespace):
         is_admin = 'admin' in session
         cont = Container.query.filter_by(id=container_id).filter(Container.status != 'removed').first()
         if not cont or (not is_admin and cont.user_id != user_id):
-            self.emit('log_message', '无权限')
+            self.emit('log_message', {'data': '无权限'})
             disconnect()
             return
 
+        # tail: 最近 N 行；since: 时间戳；cursor: 断线重连时从上次收到的位置继续
         try:
-            container = docker_client.containers.get(cont.docker_id)
-            for log in container.logs(stream=True, follow=True):
-                self.emit('log_message', log.decode('utf-8'))
-        except NotFound:
-            self.emit('log_message', '容器不存在')
-            disconnect()
-        except Exception as e:
-            self.emit('log_message', f'错误: {str(e)}')
-            disconnect()
+            tail = int(data['tail']) if data.get('tail') is not None else None
+            since = float(data['since']) if data.get('since') is not None else None
+        except (ValueError, TypeError):
+            tail, since = None, None
+        self.log_hub.subscribe(request.sid, cont.docker_id, cont.node, cursor=data.get('cursor'), since=since, tail=tail)
 
     def on_disconnect(self):
-        pass
\ No newline at end of file
+        self.log_hub.unsubscribe(request.sid)
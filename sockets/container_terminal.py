@@ -1,12 +1,19 @@
-import select
-import socket as std_socket
 import time
 import os
 from flask_socketio import Namespace, emit, disconnect
 from flask import request, session
-from utils.docker import docker_client
+from utils.nodes import node_registry
 from models.container import Container
 from utils.auth import get_user_id
+from sockets.terminal_mux import TerminalMux
+from utils.latency import LatencyStats
+
+RESIZE_DEBOUNCE = 0.1
+EXEC_READY_TIMEOUT = 2
+EXEC_READY_POLL = 0.02
+
+# 从 start_terminal 到第一帧输出的耗时
+terminal_startup = LatencyStats()
 
 
 class ContainerTerminalNamespace(Namespace):
@@ -14,6 +21,8 @@ class ContainerTerminalNamespace(Namespace):
         super().__init__(namespace or '/terminal')
         # 记录 sid -> {container_id, exec_id, socket, last_activity}
         self.terminal_sessions = {}
+        # 所有会话的输出由同一个 I/O 循环读取
+        self.mux = TerminalMux(self)
 
     def on_connect(self):
         """客户端连接时触发"""
@@ -26,6 +35,7 @@ class ContainerTerminalNamespace(Namespace):
         cols = data.get('cols')
         rows = data.get('rows')
         sid = request.sid
+        started_at = time.monotonic()
 
         if not container_id or not command or not cols or not rows:
             emit('error', {'message': 'Missing container_id, command, cols, or rows'})
@@ -56,8 +66,9 @@ class ContainerTerminalNamespace(Namespace):
             self.kill_terminal_session(s)
 
         try:
-            # 创建 exec 会话
-            exec_id = docker_client.api.exec_create(
+            # 在容器所在节点上创建 exec 会话
+            api = node_registry.client(cont.node).api
+            exec_id = api.exec_create(
                 cont.docker_id,
                 command,
                 tty=True,
@@ -66,62 +77,86 @@ class ContainerTerminalNamespace(Namespace):
                 stderr=True
             )['Id']
 
-            docker_socket = docker_client.api.exec_start(exec_id, socket=True, tty=True)
+            docker_socket = api.exec_start(exec_id, socket=True, tty=True)
 
-            time.sleep(0.5)  # 延迟，等待启动
-
-            # 初始 resize
-            try:
-                docker_client.api.exec_resize(exec_id, width=cols, height=rows)
-            except Exception as resize_error:
-                print(f"Initial resize failed (common): {resize_error}")
-                time.sleep(0.2)
-                try:
-                    docker_client.api.exec_resize(exec_id, width=cols, height=rows)
-                except Exception as retry_error:
-                    print(f"Retry resize failed: {retry_error}")
-
-            self.terminal_sessions[sid] = {
+            session_info = {
                 'container_id': container_id,
+                'node': cont.node,
                 'exec_id': exec_id,
                 'socket': docker_socket,
-                'last_activity': time.time()
+                'last_activity': time.time(),
+                'started_at': started_at,
+                'size': (cols, rows),
+                'resize_pending': True
             }
+            self.terminal_sessions[sid] = session_info
 
-            # 启动后台任务，读取终端输出
-            from app import socketio  # 避免循环导入
-            socketio.start_background_task(self.read_terminal_output, sid, docker_socket, exec_id)
+            docker_socket._sock.settimeout(None)  # 无限等待
+            self.mux.register(sid, docker_socket)
+
+            # 初始 resize 等 exec 真正运行后在后台完成，不阻塞当前处理
+            self.socketio.start_background_task(self.apply_resize, sid, session_info, 0)
 
             emit('terminal_started')
 
         except Exception as e:
             emit('error', {'message': f'Error: {str(e)}'})
 
-    def read_terminal_output(self, sid, docker_socket, exec_id):
-        """后台线程，实时读取 docker exec 输出并发送给客户端"""
+    def on_resize_terminal(self, data):
+        """终端尺寸变化，短时间内的多次调整只执行最后一次"""
+        sid = request.sid
+        session_info = self.terminal_sessions.get(sid)
+        cols = data.get('cols')
+        rows = data.get('rows')
+        if not session_info or not cols or not rows:
+            return
+        session_info['size'] = (cols, rows)
+        if session_info['resize_pending']:
+            return
+        session_info['resize_pending'] = True
+        self.socketio.start_background_task(self.apply_resize, sid, session_info, RESIZE_DEBOUNCE)
+
+    def apply_resize(self, sid, session_info, delay):
+        if delay:
+            self.socketio.sleep(delay)
+        # exec 刚启动时 resize 会失败，轮询到进程运行为止
+        deadline = time.monotonic() + EXEC_READY_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.terminal_sessions.get(sid) is not session_info:
+                return
+            try:
+                if node_registry.client(session_info['node']).api.exec_inspect(session_info['exec_id']).get('Running'):
+                    break
+            except Exception:
+                pass
+            self.socketio.sleep(EXEC_READY_POLL)
+
+        session_info['resize_pending'] = False
+        cols, rows = session_info['size']
         try:
-            docker_socket._sock.settimeout(None)  # 无限等待
+            node_registry.client(session_info['node']).api.exec_resize(session_info['exec_id'], width=cols, height=rows)
+        except Exception as e:
+            print(f"Terminal resize failed: {e}")
 
-            while True:
-                readable, _, _ = select.select([docker_socket._sock], [], [], None)
-                if readable:
-                    output = docker_socket._sock.recv(1024)
-                    if not output:
-                        # EOF，检查退出码
-                        exec_info = docker_client.api.exec_inspect(exec_id)
-                        exit_code = exec_info['ExitCode']
-                        self.emit('terminal_exit', {'exit_code': exit_code}, room=sid)
-                        break
-                    self.emit(
-                        'terminal_output',
-                        {'output': output.decode('utf-8', errors='replace')},
-                        room=sid
-                    )
+    def on_first_output(self, sid, docker_socket):
+        """会话的第一帧输出已发出，记录从请求到出现提示符的耗时"""
+        session_info = self.terminal_sessions.get(sid)
+        if not session_info or session_info['socket'] is not docker_socket:
+            return
+        elapsed = time.monotonic() - session_info['started_at']
+        terminal_startup.record(elapsed)
+        self.emit('terminal_ready', {'startup_ms': round(elapsed * 1000, 2)}, room=sid)
+
+    def finish_terminal_session(self, sid, docker_socket):
+        """exec 输出结束，回报退出码并清理"""
+        session_info = self.terminal_sessions.get(sid)
+        if not session_info or session_info['socket'] is not docker_socket:
+            return
+        try:
+            exec_info = node_registry.client(session_info['node']).api.exec_inspect(session_info['exec_id'])
+            self.emit('terminal_exit', {'exit_code': exec_info['ExitCode']}, room=sid)
         except Exception as e:
-            if isinstance(e, std_socket.timeout):
-                self.emit('error', {'message': 'Terminal timed out, but retrying...'}, room=sid)
-            else:
-                self.emit('error', {'message': f'Terminal output error: {str(e)}'}, room=sid)
+            self.emit('error', {'message': f'Terminal output error: {str(e)}'}, room=sid)
         finally:
             self.kill_terminal_session(sid)
 
@@ -151,13 +186,17 @@ class ContainerTerminalNamespace(Namespace):
             return
 
         exec_id = session_info['exec_id']
-        try:
-            pid = docker_client.api.exec_inspect(exec_id).get("Pid", 0)
-            if pid and pid > 0:
-                os.kill(pid, 9)
-        except Exception:
-            pass
+        node = node_registry.get(session_info['node'])
+        # Pid 是节点主机上的进程号，只有本机节点才能直接结束
+        if node.is_local:
+            try:
+                pid = node.client.api.exec_inspect(exec_id).get("Pid", 0)
+                if pid and pid > 0:
+                    os.kill(pid, 9)
+            except Exception:
+                pass
 
+        self.mux.unregister(session_info['socket'])
         try:
             session_info['socket']._sock.close()
         except Exception:
@@ -0,0 +1,230 @@
+import codecs
+import threading
+import time
+from collections import deque
+from itertools import count
+from flask_socketio import join_room, leave_room
+from docker.errors import NotFound
+from utils.docker import get_client
+
+# 每个容器保留的日志字节数
+BACKLOG_BYTES = 256 * 1024
+# 跟随开始时从 Docker 取回的行数，也是后加入的客户端最多能看到的行数
+BACKLOG_LINES = 500
+# 日志按帧合并发送，单帧上限和最长等待时间
+FRAME_BYTES = 32 * 1024
+FRAME_INTERVAL = 0.05
+
+_epochs = count(1)
+
+class ByteRing:
+    """定长的日志缓冲区，超出容量时从头部按整行丢弃，偏移量为流开始以来的绝对字节数"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buf = bytearray()
+        self.start = 0
+        # (绝对偏移, 收到时间)，用于按时间定位
+        self.marks = deque()
+
+    @property
+    def end(self):
+        return self.start + len(self.buf)
+
+    def append(self, data, ts):
+        self.marks.append((self.end, ts))
+        self.buf += data
+        overflow = len(self.buf) - self.capacity
+        if overflow > 0:
+            cut = self.buf.find(b'\n', overflow - 1)
+            cut = cut + 1 if cut >= 0 else overflow
+            del self.buf[:cut]
+            self.start += cut
+            while self.marks and self.marks[0][0] < self.start:
+                self.marks.popleft()
+
+    def read_from(self, offset):
+        if offset < self.start or offset > self.end:
+            return None
+        return bytes(self.buf[offset - self.start:])
+
+    def offset_since(self, ts):
+        """ts 之后收到的数据的起始偏移，缓冲区不够旧时返回 None"""
+        if not self.marks or self.marks[0][1] > ts:
+            return None
+        for offset, mark_ts in self.marks:
+            if mark_ts >= ts:
+                return offset
+        return self.end
+
+    def tail(self, lines):
+        pos = len(self.buf) - 1 if self.buf.endswith(b'\n') else len(self.buf)
+        for _ in range(lines):
+            pos = self.buf.rfind(b'\n', 0, pos)
+            if pos < 0:
+                return bytes(self.buf)
+        return bytes(self.buf[pos + 1:])
+
+class LogFollower:
+    """一个容器一条 follow 日志流，新数据写入缓冲区，合并成帧后广播到房间"""
+
+    def __init__(self, hub, docker_id, node, tail=BACKLOG_LINES, since=None):
+        self.hub = hub
+        self.docker_id = docker_id
+        self.node = node
+        self.epoch = next(_epochs)
+        self.room = f'logs:{docker_id}'
+        self.tail = tail
+        self.since = since
+        self.backlog = ByteRing(BACKLOG_BYTES)
+        self.pending = []
+        self.pending_size = 0
+        self.pending_since = None
+        self.subscribers = set()
+        self.stream = None
+        self.stopped = False
+
+    def cursor(self, offset):
+        return f'{self.epoch}:{offset}'
+
+    def run(self):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        try:
+            api = get_client(self.node).api
+            if self.since is not None:
+                self.stream = api.logs(self.docker_id, stream=True, follow=True, since=self.since)
+            else:
+                self.stream = api.logs(self.docker_id, stream=True, follow=True, tail=self.tail)
+            if self.stopped:
+                self.stream.close()
+                return
+            for chunk in self.stream:
+                text = decoder.decode(chunk)
+                with self.hub.lock:
+                    self.backlog.append(chunk, time.time())
+                    self.pending_size += len(chunk)
+                    if text:
+                        self.pending.append(text)
+                        if self.pending_since is None:
+                            self.pending_since = time.monotonic()
+                    if self.pending_size >= FRAME_BYTES:
+                        self.flush()
+        except NotFound:
+            self.hub.namespace.emit('log_message', {'data': '容器不存在'}, room=self.room)
+        except Exception as e:
+            if not self.stopped:
+                self.hub.namespace.emit('log_message', {'data': f'错误: {str(e)}'}, room=self.room)
+        finally:
+            with self.hub.lock:
+                self.flush()
+            self.hub.remove_follower(self)
+
+    def flush(self):
+        """发送积攒的日志，调用方需持有 hub.lock"""
+        if not self.pending:
+            return
+        self.hub.namespace.emit('log_message', {
+            'data': ''.join(self.pending),
+            'cursor': self.cursor(self.backlog.end),
+            'time': time.time()
+        }, room=self.room)
+        self.pending = []
+        self.pending_size = 0
+        self.pending_since = None
+
+    def replay(self, sid, cursor=None, since=None, tail=None):
+        """给刚加入的客户端补发缓冲区中的数据，调用方需持有 hub.lock"""
+        data = None
+        if cursor:
+            epoch, _, offset = cursor.partition(':')
+            if epoch == str(self.epoch) and offset.isdigit():
+                data = self.backlog.read_from(int(offset))
+        if data is None and since is not None:
+            offset = self.backlog.offset_since(since)
+            # 缓冲区不够旧时只能补发全部缓冲区
+            data = self.backlog.read_from(offset if offset is not None else self.backlog.start)
+        if data is None:
+            data = self.backlog.tail(min(tail or BACKLOG_LINES, BACKLOG_LINES))
+
+        # 尚未发出的 pending 数据会在下一帧广播给所有人，这里不重复发送
+        end = self.backlog.end - self.pending_size
+        if data and self.pending_size:
+            data = data[:max(len(data) - self.pending_size, 0)]
+        text = data.decode('utf-8', errors='replace') if data else ''
+        for i in range(0, len(text), FRAME_BYTES):
+            self.hub.namespace.emit('log_message', {
+                'data': text[i:i + FRAME_BYTES],
+                'cursor': self.cursor(end),
+                'time': time.time()
+            }, room=sid)
+
+    def close(self):
+        self.stopped = True
+        try:
+            if self.stream is not None:
+                self.stream.close()
+        except Exception:
+            pass
+
+class LogHub:
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.lock = threading.Lock()
+        self.followers = {}
+        self.sid_followers = {}
+        self.flusher_started = False
+
+    def subscribe(self, sid, docker_id, node, cursor=None, since=None, tail=None):
+        self.unsubscribe(sid)
+        with self.lock:
+            follower = self.followers.get(docker_id)
+            is_new = follower is None
+            if is_new:
+                # 新的跟随流直接按第一个客户端的 tail / since 拉取，内容通过房间广播
+                follower = self.followers[docker_id] = LogFollower(
+                    self, docker_id, node,
+                    tail=min(tail or BACKLOG_LINES, BACKLOG_LINES),
+                    since=since
+                )
+            follower.subscribers.add(sid)
+            self.sid_followers[sid] = follower
+            join_room(follower.room, sid=sid, namespace=self.namespace.namespace)
+            if not is_new:
+                follower.replay(sid, cursor=cursor, since=since, tail=tail)
+            start_flusher = not self.flusher_started
+            self.flusher_started = True
+        if is_new:
+            self.namespace.socketio.start_background_task(follower.run)
+        if start_flusher:
+            self.namespace.socketio.start_background_task(self.flush_loop)
+
+    def unsubscribe(self, sid):
+        with self.lock:
+            follower = self.sid_followers.pop(sid, None)
+            if not follower:
+                return
+            follower.subscribers.discard(sid)
+            leave_room(follower.room, sid=sid, namespace=self.namespace.namespace)
+            if follower.subscribers:
+                return
+            if self.followers.get(follower.docker_id) is follower:
+                del self.followers[follower.docker_id]
+        follower.close()
+
+    def remove_follower(self, follower):
+        with self.lock:
+            if self.followers.get(follower.docker_id) is follower:
+                del self.followers[follower.docker_id]
+            for sid in follower.subscribers:
+                if self.sid_followers.get(sid) is follower:
+                    del self.sid_followers[sid]
+
+    def flush_loop(self):
+        """按时间发送未满一帧的日志"""
+        while True:
+            self.namespace.socketio.sleep(FRAME_INTERVAL)
+            now = time.monotonic()
+            with self.lock:
+                for follower in self.followers.values():
+                    if follower.pending_since is not None and now - follower.pending_since >= FRAME_INTERVAL:
+                        follower.flush()
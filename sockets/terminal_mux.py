@@ -0,0 +1,138 @@
+import codecs
+import selectors
+import threading
+import time
+
+# 输出按帧合并发送，单帧上限和最长等待时间
+FRAME_BYTES = 32 * 1024
+FRAME_INTERVAL = 0.01
+# 客户端未确认的字节数超过上限时暂停读取，降到下限后恢复
+HIGH_WATER = 512 * 1024
+LOW_WATER = 128 * 1024
+
+class TerminalStream:
+    """单个终端会话的输出状态"""
+
+    def __init__(self, sid, docker_socket):
+        self.sid = sid
+        self.docker_socket = docker_socket
+        # 增量解码，多字节字符跨 recv 边界时不会被拆成乱码
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.pending = []
+        self.pending_size = 0
+        self.pending_since = None
+        self.inflight = 0
+        self.paused = False
+        self.closed = False
+        self.first_output = True
+
+    def feed(self, data, final=False):
+        text = self.decoder.decode(data, final=final)
+        if text:
+            self.pending.append(text)
+            self.pending_size += len(data)
+            if self.pending_since is None:
+                self.pending_since = time.monotonic()
+
+class TerminalMux:
+    """所有终端会话共用一个 I/O 循环（Linux 上为 epoll），读到的输出按 sid 合并成帧后分发"""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.streams = {}
+        self.started = False
+
+    def register(self, sid, docker_socket):
+        stream = TerminalStream(sid, docker_socket)
+        with self.lock:
+            self.streams[docker_socket] = stream
+            self.selector.register(docker_socket._sock, selectors.EVENT_READ, stream)
+            start = not self.started
+            self.started = True
+        if start:
+            self.namespace.socketio.start_background_task(self.run)
+
+    def unregister(self, docker_socket):
+        with self.lock:
+            stream = self.streams.pop(docker_socket, None)
+            if stream:
+                stream.closed = True
+            try:
+                self.selector.unregister(docker_socket._sock)
+            except (KeyError, ValueError):
+                pass
+
+    def flush(self, stream):
+        if not stream.pending:
+            return
+        text = ''.join(stream.pending)
+        size = stream.pending_size
+        stream.pending = []
+        stream.pending_size = 0
+        stream.pending_since = None
+        with self.lock:
+            stream.inflight += size
+            if stream.inflight >= HIGH_WATER and not stream.paused and not stream.closed:
+                # 浏览器处理不过来，暂停读取，让背压传回容器内的进程
+                stream.paused = True
+                self.selector.unregister(stream.docker_socket._sock)
+        self.namespace.emit(
+            'terminal_output',
+            {'output': text},
+            room=stream.sid,
+            callback=lambda *args: self.ack(stream, size)
+        )
+        if stream.first_output:
+            stream.first_output = False
+            self.namespace.on_first_output(stream.sid, stream.docker_socket)
+
+    def ack(self, stream, size):
+        with self.lock:
+            stream.inflight -= size
+            if stream.paused and stream.inflight <= LOW_WATER and not stream.closed:
+                stream.paused = False
+                self.selector.register(stream.docker_socket._sock, selectors.EVENT_READ, stream)
+
+    def run(self):
+        while True:
+            with self.lock:
+                streams = list(self.streams.values())
+            waiting = any(s.pending for s in streams)
+            if not self.selector.get_map():
+                time.sleep(FRAME_INTERVAL if waiting else 0.1)
+                events = []
+            else:
+                try:
+                    events = self.selector.select(timeout=FRAME_INTERVAL if waiting else 1)
+                except (OSError, ValueError):
+                    # 会话在 select 期间被关闭
+                    continue
+
+            for key, _ in events:
+                stream = key.data
+                try:
+                    # 每次最多读到补满一帧，帧大小不超过 FRAME_BYTES
+                    output = key.fileobj.recv(FRAME_BYTES - stream.pending_size)
+                except (BlockingIOError, InterruptedError):
+                    continue
+                except OSError:
+                    output = b''
+                if not output:
+                    # EOF，退出码查询需要访问 Docker，放到其他任务里做
+                    stream.feed(b'', final=True)
+                    self.flush(stream)
+                    self.unregister(stream.docker_socket)
+                    self.namespace.socketio.start_background_task(
+                        self.namespace.finish_terminal_session, stream.sid, stream.docker_socket
+                    )
+                    continue
+                stream.feed(output)
+                if stream.pending_size >= FRAME_BYTES:
+                    self.flush(stream)
+
+            now = time.monotonic()
+            for stream in streams:
+                if stream.pending_since is not None and now - stream.pending_since >= FRAME_INTERVAL:
+                    self.flush(stream)
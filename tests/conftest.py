@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import fake_docker
+from utils.nodes import node_registry
+
+IMAGE = 'busybox:latest'
+PORT_START = 30000
+PORT_END = 30999
+
+@pytest.fixture
+def node():
+    """一个模拟的 Docker 节点，配置为 node_registry 唯一的节点"""
+    server = fake_docker.serve(images=[IMAGE])
+    node_registry.configure(f'fake|{server.base_url}|127.0.0.1', '127.0.0.1', PORT_START, PORT_END)
+    yield node_registry.default
+    server.shutdown()
+
+@pytest.fixture
+def app(node, tmp_path):
+    """使用临时 SQLite 数据库的最小应用，只初始化数据库，不启动后台任务"""
+    from flask import Flask
+    from models import db, init_db
+
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path}/test.db',
+        ADMIN_USERNAME='admin',
+        ADMIN_PASSWORD='admin',
+        STATS_HISTORY=False,
+    )
+    init_db(app)
+    with app.app_context():
+        yield app
+        db.session.remove()
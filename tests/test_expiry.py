@@ -0,0 +1,73 @@
+"""到期删除：Docker 删除失败时保留记录和配额，并按退避时间重试"""
+from datetime import datetime, timedelta
+
+import docker
+import pytest
+
+from conftest import IMAGE
+from models import db
+from models.container import Container
+from models.quota import Quota, TOTAL_KEY
+from models.template import Template
+from utils.expiry import ExpiryScheduler, RETRY_BASE
+
+@pytest.fixture
+def expired(app, node):
+    """一个已经到期、正在运行的容器"""
+    db.session.add(Template(id=1, name='t', image=IMAGE, container_port=80))
+    Quota.reserve('u1')
+    port = node.ports.allocate()
+    docker_cont = node.client.containers.create(IMAGE, name='u1_c', ports={'80/tcp': port})
+    docker_cont.start()
+    cont = Container(name='c', user_id='u1', template_id=1, docker_id=docker_cont.id, host_port=port,
+                     node=node.name, status='running', destroy_time=datetime.now() - timedelta(minutes=1))
+    db.session.add(cont)
+    db.session.commit()
+    return cont.id, port
+
+def make_scheduler(app):
+    scheduler = ExpiryScheduler(max_workers=1)
+    scheduler.app = app
+    return scheduler
+
+def quota_used():
+    db.session.expire_all()
+    return db.session.get(Quota, 'u1').used, db.session.get(Quota, TOTAL_KEY).used
+
+def test_expire_removes_container_then_releases(app, node, expired):
+    cont_id, port = expired
+    make_scheduler(app)._expire(cont_id)
+
+    assert db.session.get(Container, cont_id).status == 'removed'
+    assert quota_used() == (0, 0)
+    assert node.client.containers.list(all=True) == []
+    assert not node.ports._test(port - node.ports.start)
+
+def test_docker_failure_keeps_record_and_retries(app, node, expired, monkeypatch):
+    cont_id, port = expired
+    scheduler = make_scheduler(app)
+
+    def fail_remove(self, **kwargs):
+        raise docker.errors.APIError('driver failed to remove root filesystem')
+    monkeypatch.setattr(docker.models.containers.Container, 'remove', fail_remove)
+
+    before = datetime.now()
+    scheduler._expire(cont_id)
+
+    db.session.expire_all()
+    assert db.session.get(Container, cont_id).status == 'running'
+    assert quota_used() == (1, 1)
+    assert node.ports._test(port - node.ports.start)
+    assert scheduler.deadlines[cont_id] >= before + timedelta(seconds=RETRY_BASE)
+
+    # 周期性同步不会把退避提前到已过去的 destroy_time
+    retry_at = scheduler.deadlines[cont_id]
+    scheduler.seed()
+    assert scheduler.deadlines[cont_id] == retry_at
+
+    monkeypatch.undo()
+    scheduler._expire(cont_id)
+    db.session.expire_all()
+    assert db.session.get(Container, cont_id).status == 'removed'
+    assert quota_used() == (0, 0)
+    assert cont_id not in scheduler.failures
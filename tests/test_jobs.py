@@ -0,0 +1,36 @@
+"""创建任务在容器已启动、记录写入失败时的清理"""
+from datetime import datetime
+
+import pytest
+
+import utils.jobs
+from conftest import IMAGE
+from models import db
+from models.image import Image
+from models.template import Template
+from utils.jobs import CreationJobs
+
+def failing_container(**kwargs):
+    raise RuntimeError('database unavailable')
+
+def test_failed_insert_removes_container_and_port(app, node, monkeypatch):
+    db.session.add(Template(id=1, name='t', image=IMAGE, container_port=80))
+    db.session.add(Image(name=IMAGE, status='ready', pulled_at=datetime.now()))
+    db.session.commit()
+    # 不经过线程池，直接调用 _create
+    jobs = CreationJobs(max_workers=1)
+    job_id = 'job1'
+    jobs.jobs[job_id] = {'id': job_id, 'user_id': 'u1', 'template_id': 1, 'name': 'c'}
+    free = node.ports.free
+    monkeypatch.setattr(utils.jobs, 'Container', failing_container)
+
+    with pytest.raises(RuntimeError):
+        jobs._create(job_id, jobs.jobs[job_id])
+
+    assert node.client.containers.list(all=True) == []
+    assert node.ports.free == free
+
+    # 同名重试不会因为名称冲突失败
+    monkeypatch.undo()
+    assert jobs._create(job_id, jobs.jobs[job_id])
+    assert [c.name for c in node.client.containers.list(all=True)] == ['u1_c']
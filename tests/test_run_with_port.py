@@ -0,0 +1,65 @@
+"""run_with_port 在端口被抢占时的重试和清理，Docker 节点用 benchmarks/fake_docker.py 模拟"""
+from types import SimpleNamespace
+
+import docker
+import pytest
+
+from conftest import IMAGE
+from utils.docker import run_with_port
+
+PORT_START = 30000
+PORT_END = 30009
+
+@pytest.fixture
+def node(node):
+    # 端口范围缩小到 10 个，方便占满
+    node.ports.configure(PORT_START, PORT_END)
+    return node
+
+def make_template():
+    return SimpleNamespace(id=1, image=IMAGE, container_port=80, cpu_limit=None, mem_limit=None, command=None)
+
+def occupy(node, port, name):
+    """模拟其他 worker 在本进程不知道的情况下用掉了 port"""
+    cont = node.client.containers.create(IMAGE, name=name, ports={'80/tcp': port})
+    cont.start()
+
+def names(node):
+    return sorted(c.name for c in node.client.containers.list(all=True))
+
+def test_port_collision_retries_with_same_name(node):
+    occupy(node, PORT_START + 3, 'other_worker')
+    node.ports.cursor = 3
+
+    docker_cont, host_port, node_name = run_with_port(make_template(), 'user_c')
+
+    assert host_port == PORT_START + 4
+    assert node_name == 'fake'
+    docker_cont.reload()
+    assert docker_cont.name == 'user_c'
+    assert docker_cont.status == 'running'
+    # 启动失败的那次创建已被删除，没有残留的 created 容器
+    assert names(node) == ['other_worker', 'user_c']
+    assert node.ports.free == PORT_END - PORT_START
+
+def test_retries_exhausted_leaves_nothing_behind(node):
+    for port in range(PORT_START, PORT_END + 1):
+        occupy(node, port, f'other_{port}')
+    free = node.ports.free
+
+    with pytest.raises(Exception, match='分配主机端口失败'):
+        run_with_port(make_template(), 'user_c')
+
+    assert 'user_c' not in names(node)
+    assert node.ports.free == free
+
+def test_other_start_failure_is_cleaned_up(node, monkeypatch):
+    def fail_start(self, **kwargs):
+        raise docker.errors.APIError('OCI runtime create failed')
+    monkeypatch.setattr(docker.models.containers.Container, 'start', fail_start)
+
+    with pytest.raises(docker.errors.APIError):
+        run_with_port(make_template(), 'user_c')
+
+    assert names(node) == []
+    assert node.ports.free == PORT_END - PORT_START + 1
@@ -0,0 +1,81 @@
+"""多个 worker 进程共用预热池：用两个 WarmPool 实例和同一个 SQLite 数据库模拟"""
+import threading
+from datetime import datetime
+
+import pytest
+
+from conftest import IMAGE
+from models import db
+from models.image import Image
+from models.pool import PoolContainer
+from models.template import Template
+from utils.nodes import node_registry
+from utils.warm_pool import WarmPool
+
+POOL_SIZE = 2
+
+@pytest.fixture
+def app(app):
+    db.session.add(Template(id=1, name='t', image=IMAGE, container_port=80, pool_size=POOL_SIZE))
+    db.session.add(Image(name=IMAGE, status='ready', pulled_at=datetime.now()))
+    db.session.commit()
+    return app
+
+def pool_names():
+    return [c.name for c in node_registry.default.client.containers.list(all=True) if c.name.startswith('pool_')]
+
+def test_pool_size_is_shared_by_workers(app):
+    first, second = WarmPool(), WarmPool()
+    first.refill_once()
+    second.refill_once()
+    assert PoolContainer.idle_counts() == {1: POOL_SIZE}
+    assert len(pool_names()) == POOL_SIZE
+
+    # 第二个 worker 启动时不会重复接管已登记的容器
+    second.adopt_existing()
+    assert PoolContainer.query.count() == POOL_SIZE
+
+def test_concurrent_acquire_hands_out_each_container_once(app):
+    WarmPool().refill_once()
+    template = db.session.get(Template, 1)
+    workers = [WarmPool() for _ in range(4)]
+    results = [None] * len(workers)
+    barrier = threading.Barrier(len(workers))
+
+    def acquire(i):
+        with app.app_context():
+            barrier.wait()
+            results[i] = workers[i].acquire(template, f'user{i}_c')
+            db.session.remove()
+
+    threads = [threading.Thread(target=acquire, args=(i,)) for i in range(len(workers))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    acquired = [r['docker_id'] for r in results if r]
+    assert len(acquired) == POOL_SIZE
+    assert len(set(acquired)) == POOL_SIZE
+    assert PoolContainer.query.count() == 0
+
+def test_leftover_containers_are_adopted_once(app):
+    WarmPool().refill_once()
+    # 模拟进程重启后池记录丢失
+    PoolContainer.query.delete()
+    db.session.commit()
+
+    first, second = WarmPool(), WarmPool()
+    first.adopt_existing()
+    second.adopt_existing()
+    assert PoolContainer.idle_counts() == {1: POOL_SIZE}
+
+def test_surplus_is_removed(app):
+    WarmPool().refill_once()
+    template = db.session.get(Template, 1)
+    template.pool_size = 1
+    db.session.commit()
+
+    WarmPool().refill_once()
+    assert PoolContainer.idle_counts() == {1: 1}
+    assert len(pool_names()) == 1
@@ -0,0 +1,44 @@
+# catalog.py
+import hashlib
+import json
+import threading
+import time
+from models.template import Template
+
+# 其他 worker 进程增删模板后最多延迟这么久生效
+CATALOG_TTL = 30
+
+class TemplateCatalog:
+    """预先序列化好的模板列表，ETag 由内容计算，各 worker 内容一致时 ETag 也一致"""
+
+    def __init__(self, ttl=CATALOG_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.loaded_at = 0
+        self.items = None
+        self.body = b''
+        self.etag = ''
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded_at = 0
+
+    def _load(self):
+        with self.lock:
+            if self.items is not None and time.time() - self.loaded_at < self.ttl:
+                return
+            items = [t.to_dict() for t in Template.query.order_by(Template.id).all()]
+            body = json.dumps({'success': True, 'templates': items}, ensure_ascii=False).encode('utf-8')
+            self.items = items
+            self.body = body
+            self.etag = hashlib.sha1(body).hexdigest()
+            self.loaded_at = time.time()
+
+    def snapshot(self):
+        """返回 (items, body, etag)，三者来自同一次加载"""
+        if self.items is None or time.time() - self.loaded_at >= self.ttl:
+            self._load()
+        with self.lock:
+            return self.items, self.body, self.etag
+
+template_catalog = TemplateCatalog()
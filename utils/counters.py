@@ -0,0 +1,77 @@
+# counters.py
+import threading
+import time
+from models import db
+from models.template import Template
+from models.container import Container
+
+# 内存计数可能因多进程或遗漏的状态变化产生偏差，定期按数据库重新统计
+RECOUNT_INTERVAL = 300
+
+class DashboardCounters:
+    """首页统计数据，由创建 / 删除 / 状态变化增量维护"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = None
+        self.users = set()
+
+    def recount(self):
+        values = {
+            'templates': Template.query.count(),
+            'running': Container.query.filter_by(status='running').count(),
+            'total': Container.query.count(),
+        }
+        users = set(user_id for (user_id,) in db.session.query(Container.user_id).distinct())
+        with self.lock:
+            self.values = values
+            self.users = users
+
+    def snapshot(self):
+        if self.values is None:
+            self.recount()
+        with self.lock:
+            return dict(self.values, users=len(self.users))
+
+    def _add(self, key, delta):
+        if self.values is not None:
+            self.values[key] += delta
+
+    def template_added(self, delta=1):
+        with self.lock:
+            self._add('templates', delta)
+
+    def container_created(self, user_id, status):
+        with self.lock:
+            self._add('total', 1)
+            if status == 'running':
+                self._add('running', 1)
+            self.users.add(user_id)
+
+    def status_changed(self, old, new):
+        if old == new:
+            return
+        with self.lock:
+            if old == 'running':
+                self._add('running', -1)
+            if new == 'running':
+                self._add('running', 1)
+
+    def run(self):
+        while True:
+            try:
+                self.recount()
+            except Exception as e:
+                print(f"Dashboard recount failed: {e}")
+            finally:
+                db.session.remove()
+            time.sleep(RECOUNT_INTERVAL)
+
+dashboard_counters = DashboardCounters()
+
+def start_counters_thread(app):
+    threading.Thread(target=lambda: counters_with_app(app), daemon=True).start()
+
+def counters_with_app(app):
+    with app.app_context():
+        dashboard_counters.run()
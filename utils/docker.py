@@ -1,43 +1,73 @@
 # docker.py
 import docker
-import threading
-import time
-from datetime import datetime
-from models import db
-from models.container import Container
-from utils.logger import log_action
-from flask import current_app
+from utils.nodes import node_registry
 
-docker_client = docker.from_env()
+# 所有由本服务创建的容器都带有该标签，事件订阅和全量同步都按它过滤
+MANAGED_LABEL = 'docker-run.managed'
+# 端口在分配后、容器启动前被占用时的重试次数
+PORT_RETRIES = 5
 
-def health_check():
-    print("Starting health check thread...")
-    while True:
-        with current_app.app_context():
-            containers = Container.query.filter(Container.status != 'removed').all()
-            for cont in containers:
-                try:
-                    docker_cont = docker_client.containers.get(cont.docker_id)
-                    if docker_cont.status != cont.status:
-                        cont.status = docker_cont.status
-                        db.session.commit()
+def get_client(node):
+    """容器所在节点的 Docker 客户端，node 为节点名称"""
+    return node_registry.client(node)
 
-                    if cont.destroy_time < datetime.now():
-                        docker_cont.remove(force=True)
-                        cont.status = 'removed'
-                        db.session.commit()
-                        log_action(f'Auto-remove container {cont.docker_id}', 'system')
+def build_container_config(template, host_port, name):
+    container_config = {
+        "image": template.image,
+        "detach": True,
+        "ports": {f"{template.container_port}/tcp": host_port},
+        "cpu_quota": int(float(template.cpu_limit) * 100000) if template.cpu_limit else None,
+        "mem_limit": template.mem_limit if template.mem_limit else None,
+        "name": name,
+        "labels": {MANAGED_LABEL: '1'}
+    }
+    if template.command and len(template.command.strip()) > 0:
+        container_config["command"] = template.command
+    return container_config
 
-                except docker.errors.NotFound:
-                    cont.status = 'removed'
-                    db.session.commit()
-                    log_action(f'Delete non-existent container {cont.docker_id}', 'system')
+def port_in_use(error):
+    message = str(error)
+    return 'port is already allocated' in message or 'address already in use' in message
 
-        time.sleep(60)
+def remove_quietly(docker_cont):
+    """删除启动失败的容器，释放它占用的名称"""
+    try:
+        docker_cont.remove(force=True)
+    except docker.errors.NotFound:
+        pass
+    except Exception as e:
+        print(f"Failed to remove container {docker_cont.id}: {e}")
 
-def start_health_check_thread(app):
-    threading.Thread(target=lambda: health_check_with_app(app), daemon=True).start()
+def run_with_port(template, name, labels=None):
+    """选择节点、分配主机端口并启动容器，端口被其他进程抢先占用时换一个重试，返回 (容器, 端口, 节点名称)。
 
-def health_check_with_app(app):
-    with app.app_context():
-        health_check()
+    先 create 再 start：启动失败时删掉已创建的容器并释放端口，下一次重试才能继续使用同一个名称。
+    """
+    node = node_registry.place(template)
+    for _ in range(PORT_RETRIES):
+        host_port = node.ports.allocate()
+        container_config = build_container_config(template, host_port, name)
+        container_config.pop('detach')
+        if labels:
+            container_config['labels'].update(labels)
+        try:
+            try:
+                docker_cont = node.client.containers.create(**container_config)
+            except docker.errors.ImageNotFound:
+                # 与 containers.run 一样，镜像不存在时先拉取
+                node.client.images.pull(template.image)
+                docker_cont = node.client.containers.create(**container_config)
+        except Exception:
+            node.ports.release(host_port)
+            raise
+        try:
+            docker_cont.start()
+        except Exception as e:
+            remove_quietly(docker_cont)
+            # 端口由占用它的进程负责，本进程不长期标记；next-fit 的游标已经越过它，下一次换新端口
+            node.ports.release(host_port)
+            if isinstance(e, docker.errors.APIError) and port_in_use(e):
+                continue
+            raise
+        return docker_cont, host_port, node.name
+    raise Exception('分配主机端口失败，请稍后重试')
@@ -0,0 +1,145 @@
+# expiry.py
+import heapq
+import threading
+import time
+import docker
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from models import db
+from models.container import Container
+from utils.nodes import node_registry
+from utils.logger import log_action
+from utils.removal import mark_removed
+
+EXPIRY_WORKERS = 8
+# 其他 worker 进程创建 / 延期的容器不会通知到本进程，定期从数据库补齐
+RESYNC_INTERVAL = 300
+# 删除 Docker 容器失败时的重试间隔，按失败次数翻倍
+RETRY_BASE = 10
+RETRY_MAX = 600
+
+class ExpiryScheduler:
+    """按 destroy_time 排序的最小堆，到期时把删除任务交给线程池执行"""
+
+    def __init__(self, max_workers=EXPIRY_WORKERS):
+        self.cond = threading.Condition()
+        self.heap = []
+        # cont_id -> 当前有效的 destroy_time，堆中与之不符的旧条目在弹出时丢弃
+        self.deadlines = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='expiry')
+        # cont_id -> 连续删除失败的次数
+        self.failures = {}
+        self.app = None
+
+    def schedule(self, cont_id, destroy_time):
+        if destroy_time is None:
+            return
+        with self.cond:
+            if self.deadlines.get(cont_id) == destroy_time:
+                return
+            self.deadlines[cont_id] = destroy_time
+            heapq.heappush(self.heap, (destroy_time, cont_id))
+            if len(self.heap) > 2 * len(self.deadlines) + 64:
+                self.heap = [(t, c) for c, t in self.deadlines.items()]
+                heapq.heapify(self.heap)
+            if self.heap[0][1] == cont_id:
+                self.cond.notify()
+
+    def cancel(self, cont_id):
+        with self.cond:
+            self.deadlines.pop(cont_id, None)
+        self.failures.pop(cont_id, None)
+
+    def seed(self):
+        rows = db.session.query(Container.id, Container.destroy_time)\
+            .filter(Container.status != 'removed').all()
+        for cont_id, destroy_time in rows:
+            with self.cond:
+                scheduled = self.deadlines.get(cont_id)
+            # 删除失败后按退避时间排期的容器，不要被已过去的 destroy_time 提前
+            if scheduled is not None and destroy_time is not None and scheduled > destroy_time:
+                continue
+            self.schedule(cont_id, destroy_time)
+
+    def _pop_due(self):
+        due = []
+        now = datetime.now()
+        while self.heap:
+            destroy_time, cont_id = self.heap[0]
+            if self.deadlines.get(cont_id) != destroy_time:
+                heapq.heappop(self.heap)
+                continue
+            if destroy_time > now:
+                break
+            heapq.heappop(self.heap)
+            del self.deadlines[cont_id]
+            due.append(cont_id)
+        return due
+
+    def _expire(self, cont_id):
+        with self.app.app_context():
+            try:
+                cont = Container.query.filter_by(id=cont_id).filter(Container.status != 'removed').first()
+                if not cont:
+                    return
+                if cont.destroy_time > datetime.now():
+                    # 已被延期（可能来自其他进程），重新排期
+                    self.schedule(cont.id, cont.destroy_time)
+                    return
+                # 先删除 Docker 容器，成功后才把记录标记为 removed 并释放配额和端口
+                try:
+                    node_registry.client(cont.node).containers.get(cont.docker_id).remove(force=True)
+                    action = f'Auto-remove container {cont.docker_id}'
+                except docker.errors.NotFound:
+                    action = f'Delete non-existent container {cont.docker_id}'
+                except Exception as e:
+                    self._retry(cont_id, e)
+                    return
+                self.failures.pop(cont_id, None)
+                if mark_removed(cont):
+                    log_action(action, 'system')
+            except Exception as e:
+                db.session.rollback()
+                print(f"Failed to expire container {cont_id}: {e}")
+
+    def _retry(self, cont_id, error):
+        failures = self.failures.get(cont_id, 0) + 1
+        self.failures[cont_id] = failures
+        delay = min(RETRY_BASE * 2 ** (failures - 1), RETRY_MAX)
+        print(f"Failed to remove expired container {cont_id} (attempt {failures}), retry in {delay}s: {error}")
+        self.schedule(cont_id, datetime.now() + timedelta(seconds=delay))
+
+    def run(self):
+        print("Starting expiry scheduler thread...")
+        next_resync = 0
+        while True:
+            if time.time() >= next_resync:
+                try:
+                    self.seed()
+                except Exception as e:
+                    print(f"Expiry scheduler seed failed: {e}")
+                finally:
+                    db.session.remove()
+                next_resync = time.time() + RESYNC_INTERVAL
+
+            with self.cond:
+                due = self._pop_due()
+                if not due:
+                    timeout = next_resync - time.time()
+                    if self.heap:
+                        timeout = min(timeout, (self.heap[0][0] - datetime.now()).total_seconds())
+                    self.cond.wait(max(timeout, 0))
+                    due = self._pop_due()
+
+            for cont_id in due:
+                self.executor.submit(self._expire, cont_id)
+
+expiry_scheduler = ExpiryScheduler()
+
+def start_expiry_thread(app):
+    expiry_scheduler.app = app
+    threading.Thread(target=lambda: expiry_with_app(app), daemon=True).start()
+
+def expiry_with_app(app):
+    with app.app_context():
+        expiry_scheduler.run()
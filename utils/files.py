@@ -0,0 +1,102 @@
+# files.py
+import base64
+import heapq
+import json
+import os
+from datetime import datetime
+
+# 目录列表每页条目数
+LIST_PAGE_SIZE = 200
+LIST_MAX_PAGE_SIZE = 1000
+LIST_SORTS = ('name', 'size', 'created_time')
+
+def _is_dir(entry):
+    # DirEntry.is_dir() 直接使用 readdir 返回的 d_type，只有符号链接或文件系统不提供 d_type 时才会 stat
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+def _stat(entry):
+    """跟随符号链接取 stat，断开的链接退回到链接本身，条目已被删除时返回 None"""
+    try:
+        return entry.stat()
+    except OSError:
+        try:
+            return entry.stat(follow_symlinks=False)
+        except OSError:
+            return None
+
+def encode_cursor(sort, order, key):
+    data = json.dumps([sort, order, key], separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort, order):
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, cursor_order, key = json.loads(data)
+    except Exception:
+        raise ValueError('无效的分页游标')
+    if cursor_sort != sort or cursor_order != order:
+        raise ValueError('分页游标与排序方式不一致')
+    return key
+
+def list_directory(host_path, cursor=None, limit=LIST_PAGE_SIZE, sort='name', order='asc', query=None):
+    """按 (目录优先, 排序字段, 名称) 的游标分页列出目录。
+
+    按名称排序时只读取目录项和 d_type，只对当前页的条目 stat；按大小、时间排序时需要 stat 全部条目。
+    每页用大小为 limit 的堆选出，不对整个目录排序。
+    """
+    if sort not in LIST_SORTS:
+        raise ValueError(f'不支持的排序字段: {sort}')
+    order = 'desc' if order == 'desc' else 'asc'
+    desc = order == 'desc'
+    after = decode_cursor(cursor, sort, order) if cursor else None
+    needle = query.lower() if query else None
+    counter = {'total': 0}
+
+    def candidates():
+        with os.scandir(host_path) as entries:
+            for entry in entries:
+                name = entry.name
+                lower = name.lower()
+                if needle and needle not in lower:
+                    continue
+                is_dir = _is_dir(entry)
+                counter['total'] += 1
+                # 倒序时取最大的若干项，目录的分组值取 1 才能仍然排在前面
+                group = int(is_dir) if desc else int(not is_dir)
+                stat_info = None
+                if sort == 'name':
+                    key = [group, lower, name]
+                else:
+                    stat_info = _stat(entry)
+                    if stat_info is None:
+                        continue
+                    value = stat_info.st_size if sort == 'size' else stat_info.st_ctime
+                    key = [group, value, lower, name]
+                if after is not None and (key >= after if desc else key <= after):
+                    continue
+                yield key, entry, is_dir, stat_info
+
+    select = heapq.nlargest if desc else heapq.nsmallest
+    page = select(limit + 1, candidates(), key=lambda c: c[0])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    files = []
+    for key, entry, is_dir, stat_info in page:
+        stat_info = stat_info or _stat(entry)
+        if stat_info is None:
+            continue
+        files.append({
+            'type': 'dir' if is_dir else 'file',
+            'name': entry.name,
+            'size': stat_info.st_size,
+            'created_time': datetime.fromtimestamp(stat_info.st_ctime)
+        })
+    return {
+        'files': files,
+        'total': counter['total'],
+        'next_cursor': encode_cursor(sort, order, page[-1][0]) if has_more else None
+    }
@@ -0,0 +1,205 @@
+# images.py
+import json
+import queue
+import threading
+import time
+import docker
+from datetime import datetime
+from docker.utils import parse_repository_tag
+from models import db
+from models.image import Image
+from models.template import Template
+from utils.nodes import node_registry
+from utils.logger import log_action
+
+# 定期重新拉取所有模板镜像，获取同一标签下的新版本
+REPULL_INTERVAL = 6 * 3600
+# 拉取进度写回数据库的最小间隔
+PROGRESS_INTERVAL = 1
+
+class ImageManager:
+    """后台把模板镜像拉取到所有节点，记录进度；定期重新拉取并清理不再被引用的镜像"""
+
+    def __init__(self):
+        # (镜像名称, 是否强制重新拉取)，None 表示只做一次清理
+        self.queue = queue.Queue()
+        self.gc_event = threading.Event()
+
+    def ensure(self, name):
+        """确保镜像有记录并安排拉取，返回镜像当前是否可用"""
+        image = Image.get_or_create(name)
+        if image.pulled_at is not None:
+            return True
+        if image.status != 'pulling':
+            # 各节点都已经有这个镜像（例如手动拉取过）时直接标记为可用
+            try:
+                if not self._missing_nodes(name):
+                    self._record_local(image, name)
+                    db.session.commit()
+                    return True
+            except Exception as e:
+                print(f"Failed to inspect image {name}: {e}")
+        # 其他进程正在拉取时 claim 会失败，重复入队没有副作用
+        self.queue.put((name, False))
+        return False
+
+    def request_gc(self):
+        self.gc_event.set()
+        self.queue.put(None)
+
+    def _missing_nodes(self, name):
+        missing = []
+        for node in node_registry.all():
+            try:
+                node.client.images.get(name)
+            except docker.errors.ImageNotFound:
+                missing.append(node)
+        return missing
+
+    def _record_local(self, image, name):
+        docker_image = node_registry.default.client.images.get(name)
+        image.status = 'ready'
+        image.digest = (docker_image.attrs.get('RepoDigests') or [docker_image.id])[0]
+        image.size = docker_image.attrs.get('Size')
+        image.pulled_at = datetime.now()
+        image.updated_at = datetime.now()
+
+    def seed(self):
+        """启动时为所有模板镜像建立记录，本地已有的镜像直接标记为可用"""
+        for name in set(t.image for t in Template.query.all() if t.image):
+            image = Image.get_or_create(name)
+            if image.pulled_at is not None:
+                continue
+            if self._missing_nodes(name):
+                self.queue.put((name, False))
+            else:
+                self._record_local(image, name)
+                db.session.commit()
+
+    def pull(self, name, force=False):
+        if not force and Image.is_ready(name):
+            return
+        if not Image.claim(name):
+            return
+        image = Image.query.filter_by(name=name).first()
+        repository, tag = parse_repository_tag(name)
+        layers = {}
+        last_flush = 0
+        try:
+            nodes = node_registry.all() if force else self._missing_nodes(name)
+            for node in nodes:
+                for event in node.client.api.pull(repository, tag=tag or 'latest', stream=True, decode=True):
+                    if 'error' in event:
+                        raise Exception(f"{node.name}: {event['error']}")
+                    # 不同节点的同一层分别计算进度
+                    layer = f"{node.name}/{event['id']}" if event.get('id') else None
+                    detail = event.get('progressDetail') or {}
+                    if layer and detail.get('total'):
+                        layers.setdefault(layer, {'total': 0, 'current': 0})
+                        layers[layer]['total'] = detail['total']
+                        if event.get('status') == 'Downloading':
+                            layers[layer]['current'] = detail.get('current', 0)
+                    if layer in layers and event.get('status') in ('Download complete', 'Pull complete'):
+                        layers[layer]['current'] = layers[layer]['total']
+
+                    if time.time() - last_flush >= PROGRESS_INTERVAL:
+                        self._flush_progress(image, layers)
+                        last_flush = time.time()
+
+            self._flush_progress(image, layers, commit=False)
+            self._record_local(image, name)
+            image.error = None
+            db.session.commit()
+            log_action(f'Pull image {name}', 'system')
+        except Exception as e:
+            db.session.rollback()
+            image = Image.query.filter_by(name=name).first()
+            # 之前拉取成功过的镜像仍然可用
+            image.status = 'ready' if image.pulled_at else 'failed'
+            image.error = str(e)
+            image.updated_at = datetime.now()
+            db.session.commit()
+            print(f"Failed to pull image {name}: {e}")
+
+    def _flush_progress(self, image, layers, commit=True):
+        image.layers = json.dumps({k: v['total'] for k, v in layers.items()})
+        image.bytes_total = sum(v['total'] for v in layers.values())
+        image.bytes_done = sum(v['current'] for v in layers.values())
+        image.updated_at = datetime.now()
+        if commit:
+            db.session.commit()
+
+    def repull_all(self):
+        for name in set(t.image for t in Template.query.all() if t.image):
+            Image.get_or_create(name)
+            self.queue.put((name, True))
+
+    def gc(self):
+        """删除不再被任何模板引用、也没有容器在使用的镜像"""
+        referenced = set(t.image for t in Template.query.all())
+        for image in Image.query.all():
+            if image.name in referenced or image.status == 'pulling':
+                continue
+            removed = True
+            for node in node_registry.all():
+                try:
+                    if node.client.containers.list(all=True, filters={'ancestor': image.name}):
+                        removed = False
+                        continue
+                    node.client.images.remove(image.name)
+                    log_action(f'Remove image {image.name} on {node.name}', 'system')
+                except docker.errors.ImageNotFound:
+                    pass
+                except Exception as e:
+                    print(f"Failed to remove image {image.name} on {node.name}: {e}")
+                    removed = False
+            # 还有节点没删掉时保留记录，下次清理再试
+            if removed:
+                db.session.delete(image)
+                db.session.commit()
+
+    def run(self):
+        print("Starting image manager thread...")
+        try:
+            self.seed()
+        except Exception as e:
+            print(f"Image manager seed failed: {e}")
+        finally:
+            db.session.remove()
+        next_repull = time.time() + REPULL_INTERVAL
+        while True:
+            try:
+                item = self.queue.get(timeout=max(next_repull - time.time(), 0))
+                if item is not None:
+                    self.pull(*item)
+            except queue.Empty:
+                try:
+                    self.repull_all()
+                except Exception as e:
+                    print(f"Image manager repull failed: {e}")
+                next_repull = time.time() + REPULL_INTERVAL
+                self.gc_event.set()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Image manager failed: {e}")
+            finally:
+                db.session.remove()
+
+            if self.gc_event.is_set():
+                self.gc_event.clear()
+                try:
+                    self.gc()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Image manager gc failed: {e}")
+                finally:
+                    db.session.remove()
+
+image_manager = ImageManager()
+
+def start_image_manager_thread(app):
+    threading.Thread(target=lambda: image_manager_with_app(app), daemon=True).start()
+
+def image_manager_with_app(app):
+    with app.app_context():
+        image_manager.run()
@@ -0,0 +1,203 @@
+# jobs.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import docker
+from flask import current_app
+from models import db
+from models.container import Container
+from models.image import Image
+from models.quota import Quota
+from models.template import Template
+from utils.docker import run_with_port
+from utils.nodes import node_registry
+from utils.warm_pool import warm_pool
+from utils.images import image_manager
+from utils.expiry import expiry_scheduler
+from utils.stats import stats_cache
+from utils.counters import dashboard_counters
+from utils.logger import log_action
+from utils.latency import LatencyStats
+
+CREATE_WORKERS = 4
+# 排队中的任务超过这个数量时拒绝新的创建请求
+MAX_PENDING = 100
+# 内存中保留的已结束任务数
+KEEP_FINISHED = 1000
+PULL_WAIT_TIMEOUT = 600
+PULL_POLL = 1
+
+class CreationJobs:
+    """容器创建任务队列：请求只负责提交，固定大小的线程池依次执行，状态通过 Socket.IO 推送"""
+
+    def __init__(self, max_workers=CREATE_WORKERS):
+        self.lock = threading.Lock()
+        # job_id -> job，按提交顺序排列
+        self.jobs = OrderedDict()
+        self.pending = 0
+        self.running = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='create')
+        # 排队等待时间、执行时间
+        self.wait_times = LatencyStats()
+        self.run_times = LatencyStats()
+        self.app = None
+        self.namespace = None
+
+    def submit(self, user_id, template_id, container_name, redirect):
+        """提交创建任务，队列已满时返回 None"""
+        with self.lock:
+            if self.pending >= MAX_PENDING:
+                return None
+            job = {
+                'id': uuid.uuid4().hex,
+                'user_id': user_id,
+                'template_id': template_id,
+                'name': container_name,
+                'status': 'queued',
+                'message': '排队中',
+                'container_id': None,
+                'redirect': redirect,
+                'queued_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+            }
+            self.jobs[job['id']] = job
+            self.pending += 1
+            self._trim()
+        self.executor.submit(self._run, job['id'])
+        return dict(job)
+
+    def _trim(self):
+        finished = [j['id'] for j in self.jobs.values() if j['finished_at'] is not None]
+        for job_id in finished[:max(len(finished) - KEEP_FINISHED, 0)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            job = self.jobs[job_id]
+            job.update(fields)
+            data = dict(job)
+        if self.namespace is not None:
+            self.namespace.emit('job_status', data, room=job_id)
+        return data
+
+    def snapshot(self):
+        with self.lock:
+            depth, running = self.pending, self.running
+        return {
+            'pending': depth,
+            'running': running,
+            'max_pending': MAX_PENDING,
+            'workers': self.executor._max_workers,
+            'wait': self.wait_times.summary(),
+            'run': self.run_times.summary(),
+        }
+
+    def _wait_for_image(self, job_id, image_name):
+        if image_manager.ensure(image_name):
+            return
+        self._update(job_id, status='pulling', message='正在拉取镜像')
+        since = datetime.now()
+        deadline = time.time() + PULL_WAIT_TIMEOUT
+        while time.time() < deadline:
+            # 结束当前事务，才能看到镜像管理线程提交的最新状态
+            db.session.rollback()
+            image = Image.query.filter_by(name=image_name).first()
+            if image is not None and image.pulled_at is not None:
+                return
+            if image is not None and image.status == 'failed' and image.updated_at and image.updated_at > since:
+                raise Exception(f'镜像拉取失败: {image.error}')
+            time.sleep(PULL_POLL)
+        raise Exception('镜像拉取超时')
+
+    def _create(self, job_id, job):
+        template = Template.query.get(job['template_id'])
+        if not template:
+            raise Exception('模板不存在')
+        self._wait_for_image(job_id, template.image)
+
+        self._update(job_id, status='creating', message='正在创建容器')
+        user_id = job['user_id']
+        full_name = f"{user_id}_{job['name']}"
+        pooled = warm_pool.acquire(template, full_name)
+        if pooled:
+            docker_id = pooled['docker_id']
+            host_port = pooled['host_port']
+            node = pooled['node']
+        else:
+            docker_cont, host_port, node = run_with_port(template, full_name)
+            docker_id = docker_cont.id
+
+        # 默认 2 小时后销毁
+        destroy_time = datetime.now() + timedelta(hours=2)
+        try:
+            container = Container(
+                name=job['name'],
+                user_id=user_id,
+                template_id=template.id,
+                docker_id=docker_id,
+                host_port=host_port,
+                node=node,
+                status='running',
+                destroy_time=destroy_time
+            )
+            db.session.add(container)
+            db.session.commit()
+        except Exception:
+            # 记录没有写入，容器不会被任何地方跟踪，删掉它并释放端口和名称
+            db.session.rollback()
+            self._discard(docker_id, node, host_port)
+            raise
+        expiry_scheduler.schedule(container.id, destroy_time)
+        dashboard_counters.container_created(user_id, 'running')
+        if current_app.config['STATS_HISTORY']:
+            stats_cache.watch(docker_id, node)
+        log_action(f'Create container {docker_id}', user_id)
+        return container.id
+
+    def _discard(self, docker_id, node, host_port):
+        try:
+            node_registry.client(node).containers.get(docker_id).remove(force=True)
+        except docker.errors.NotFound:
+            pass
+        except Exception as e:
+            print(f"Failed to remove container {docker_id} of failed job: {e}")
+            return
+        node_registry.release_port(node, host_port)
+
+    def _run(self, job_id):
+        started = time.time()
+        with self.lock:
+            job = dict(self.jobs[job_id])
+            self.pending -= 1
+            self.running += 1
+        self.wait_times.record(started - job['queued_at'])
+        self._update(job_id, started_at=started)
+
+        with self.app.app_context():
+            try:
+                container_id = self._create(job_id, job)
+                self._update(job_id, status='running', message='容器创建成功',
+                             container_id=container_id, finished_at=time.time())
+            except Exception as e:
+                db.session.rollback()
+                Quota.release(job['user_id'])
+                self._update(job_id, status='failed', message=f'容器创建失败: {str(e)}', finished_at=time.time())
+            finally:
+                db.session.remove()
+                with self.lock:
+                    self.running -= 1
+                self.run_times.record(time.time() - started)
+
+creation_jobs = CreationJobs()
+
+def init_creation_jobs(app):
+    creation_jobs.app = app
@@ -0,0 +1,33 @@
+import threading
+from collections import deque
+
+class LatencyStats:
+    """保留最近若干次耗时样本（秒），用于统计分位数"""
+
+    def __init__(self, maxlen=1000):
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=maxlen)
+        self.count = 0
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def summary(self):
+        with self.lock:
+            samples = sorted(self.samples)
+            count = self.count
+        if not samples:
+            return {'count': count}
+
+        def pct(p):
+            return round(samples[min(int(len(samples) * p), len(samples) - 1)] * 1000, 2)
+
+        return {
+            'count': count,
+            'p50_ms': pct(0.5),
+            'p90_ms': pct(0.9),
+            'p99_ms': pct(0.99),
+            'max_ms': round(samples[-1] * 1000, 2)
+        }
@@ -1,12 +1,112 @@
+import atexit
+import json
+import os
+import queue
+import threading
+from datetime import datetime
 from models import db
 from models.log import Log
-from datetime import datetime
+
+QUEUE_SIZE = 10000
+BATCH_SIZE = 200
+BATCH_INTERVAL = 1
+
+class AuditWriter:
+    """审计日志先进入内存队列，由后台线程按批写入数据库，数据库不可用时写入本地文件"""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.stopping = threading.Event()
+        self.thread = None
+        self.app = None
+        self.spill_file = None
+        self.spill_lock = threading.Lock()
+
+    def put(self, row):
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            # 队列满时不阻塞请求，直接落盘
+            self.spill([row])
+
+    def spill(self, rows):
+        path = self.spill_file or 'audit_spill.jsonl'
+        with self.spill_lock:
+            with open(path, 'a', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(dict(row, timestamp=row['timestamp'].isoformat()), ensure_ascii=False) + '\n')
+
+    def load_spilled(self):
+        """取回之前落盘的日志，取回后删除文件"""
+        path = self.spill_file
+        if not path or not os.path.exists(path):
+            return []
+        with self.spill_lock:
+            with open(path, encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            os.remove(path)
+        for row in rows:
+            row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+        return rows
+
+    def write(self, rows):
+        try:
+            db.session.bulk_insert_mappings(Log, rows)
+            db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            print(f"Audit log write failed, spilling {len(rows)} rows: {e}")
+            self.spill(rows)
+            return False
+        finally:
+            db.session.remove()
+
+    def next_batch(self):
+        rows = []
+        try:
+            rows.append(self.queue.get(timeout=BATCH_INTERVAL))
+        except queue.Empty:
+            return rows
+        while len(rows) < BATCH_SIZE:
+            try:
+                rows.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def run(self):
+        print("Starting audit writer thread...")
+        with self.app.app_context():
+            spilled = self.load_spilled()
+            if spilled:
+                self.write(spilled)
+            while not (self.stopping.is_set() and self.queue.empty()):
+                rows = self.next_batch()
+                if rows and self.write(rows) and os.path.exists(self.spill_file):
+                    # 数据库恢复后补写落盘的日志
+                    self.write(self.load_spilled())
+
+    def start(self, app):
+        self.app = app
+        self.spill_file = app.config['AUDIT_SPILL_FILE']
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.shutdown)
+
+    def shutdown(self, timeout=5):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+audit_writer = AuditWriter()
+
+def start_audit_writer(app):
+    audit_writer.start(app)
 
 def log_action(action, user_id):
-    log_entry = Log(
-        user_id=user_id, 
-        action=action, 
-        timestamp=datetime.utcnow()
-    )
-    db.session.add(log_entry)
-    db.session.commit()
\ No newline at end of file
+    audit_writer.put({
+        'user_id': user_id,
+        'action': action,
+        'timestamp': datetime.utcnow()
+    })
@@ -0,0 +1,126 @@
+# metrics.py
+import threading
+import time
+from array import array
+
+FIELDS = ('cpu_percent', 'mem_usage', 'net_rx', 'net_tx', 'blk_read', 'blk_write')
+# 最近一小时按秒保存，之后按分钟保存，最多 24 小时
+SECOND_CAPACITY = 3600
+MINUTE_CAPACITY = 24 * 60
+# 同时保留历史的容器数上限，超过后淘汰最久未更新的
+MAX_TRACKED = 500
+
+class Ring:
+    """定长环形缓冲区，时间戳和各指标分别存放在紧凑的 array 中"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = array('l', [0]) * capacity
+        self.values = [array('f', [0.0]) * capacity for _ in FIELDS]
+        self.head = 0
+        self.size = 0
+
+    def append(self, ts, row):
+        i = self.head
+        self.times[i] = ts
+        for values, v in zip(self.values, row):
+            values[i] = v
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def oldest(self):
+        if self.size == 0:
+            return None
+        return self.times[(self.head - self.size) % self.capacity]
+
+    def query(self, start, step):
+        """返回 start 之后的数据，按 step 秒分桶取平均"""
+        points = []
+        bucket = None
+        sums = [0.0] * len(FIELDS)
+        count = 0
+        for k in range(self.size):
+            i = (self.head - self.size + k) % self.capacity
+            ts = self.times[i]
+            if ts < start:
+                continue
+            b = ts - ts % step
+            if b != bucket:
+                if count:
+                    points.append([bucket] + [round(s / count, 2) for s in sums])
+                bucket = b
+                sums = [0.0] * len(FIELDS)
+                count = 0
+            for j, values in enumerate(self.values):
+                sums[j] += values[i]
+            count += 1
+        if count:
+            points.append([bucket] + [round(s / count, 2) for s in sums])
+        return points
+
+class MetricsHistory:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seconds = Ring(SECOND_CAPACITY)
+        self.minutes = Ring(MINUTE_CAPACITY)
+        self.minute = None
+        self.minute_sums = [0.0] * len(FIELDS)
+        self.minute_count = 0
+        self.prev = None
+        self.updated = 0
+
+    def record(self, ts, stats):
+        """stats 为 compute_stats() 的结果，网络和磁盘计数转换为每秒速率"""
+        counters = (stats['net_rx'], stats['net_tx'], stats['blk_read'], stats['blk_write'])
+        with self.lock:
+            if self.prev and ts > self.prev[0]:
+                elapsed = ts - self.prev[0]
+                rates = [max(c - p, 0) / elapsed for c, p in zip(counters, self.prev[1])]
+            else:
+                rates = [0.0] * len(counters)
+            self.prev = (ts, counters)
+            row = [stats['cpu_percent'], stats['mem_usage']] + rates
+
+            second = int(ts)
+            self.seconds.append(second, row)
+
+            minute = second - second % 60
+            if self.minute is not None and minute != self.minute and self.minute_count:
+                self.minutes.append(self.minute, [s / self.minute_count for s in self.minute_sums])
+                self.minute_sums = [0.0] * len(FIELDS)
+                self.minute_count = 0
+            self.minute = minute
+            for j, v in enumerate(row):
+                self.minute_sums[j] += v
+            self.minute_count += 1
+            self.updated = time.time()
+
+    def query(self, start, step):
+        with self.lock:
+            oldest = self.seconds.oldest()
+            # 按秒的缓冲区还没写满时包含了全部历史，容器刚启动或服务刚重启时也用它
+            seconds_cover = oldest is not None and (self.seconds.size < self.seconds.capacity or start >= oldest)
+            if step < 60 and seconds_cover:
+                return self.seconds.query(start, step)
+            return self.minutes.query(start, max(step - step % 60, 60))
+
+class MetricsStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histories = {}
+
+    def get(self, docker_id, create=False):
+        with self.lock:
+            history = self.histories.get(docker_id)
+            if history is None and create:
+                if len(self.histories) >= MAX_TRACKED:
+                    stale = min(self.histories, key=lambda k: self.histories[k].updated)
+                    del self.histories[stale]
+                history = self.histories[docker_id] = MetricsHistory()
+            return history
+
+    def drop(self, docker_id):
+        with self.lock:
+            self.histories.pop(docker_id, None)
+
+metrics_store = MetricsStore()
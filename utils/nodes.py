@@ -0,0 +1,209 @@
+# nodes.py
+import threading
+import time
+import docker
+from docker.utils import parse_bytes
+from models import db
+from models.container import Container
+from models.template import Template
+from utils.ports import PortAllocator
+
+DEFAULT_NODE = 'local'
+REFRESH_INTERVAL = 30
+
+def template_resources(template):
+    """模板申请的 (CPU 核数, 内存字节数)，未限制时记为 0"""
+    try:
+        cpu = float(template.cpu_limit) if template.cpu_limit else 0.0
+    except ValueError:
+        cpu = 0.0
+    try:
+        mem = parse_bytes(template.mem_limit) if template.mem_limit else 0
+    except Exception:
+        mem = 0
+    return cpu, mem
+
+class Node:
+    """一个 Docker 节点：连接、主机端口位图以及资源使用情况"""
+
+    def __init__(self, name, base_url=None, host_ip=None):
+        self.name = name
+        # base_url 为空时按 DOCKER_HOST 等环境变量连接
+        self.base_url = base_url
+        self.host_ip = host_ip
+        # 通过本机 unix socket 连接的节点与本服务在同一台主机上
+        self.is_local = base_url is None or base_url.startswith('unix://')
+        self.ports = PortAllocator(check_bind=self.is_local)
+        self._client = None
+        self.lock = threading.Lock()
+        self.healthy = True
+        self.last_error = None
+        self.ncpu = 0
+        self.mem_total = 0
+        self.cpu_reserved = 0.0
+        self.mem_reserved = 0
+        self.containers = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self.lock:
+                if self._client is None:
+                    if self.base_url:
+                        self._client = docker.DockerClient(base_url=self.base_url)
+                    else:
+                        self._client = docker.from_env()
+        return self._client
+
+    def score(self, cpu, mem):
+        """放置后剩余资源比例中较小的一项，越大越空闲"""
+        free_cpu = (self.ncpu - self.cpu_reserved - cpu) / self.ncpu if self.ncpu else 0
+        free_mem = (self.mem_total - self.mem_reserved - mem) / self.mem_total if self.mem_total else 0
+        return min(free_cpu, free_mem)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'base_url': self.base_url,
+            'host_ip': self.host_ip,
+            'healthy': self.healthy,
+            'last_error': self.last_error,
+            'ncpu': self.ncpu,
+            'mem_total': self.mem_total,
+            'cpu_reserved': round(self.cpu_reserved, 2),
+            'mem_reserved': self.mem_reserved,
+            'containers': self.containers,
+            'free_ports': self.ports.free,
+        }
+
+class NodeRegistry:
+    """所有 Docker 节点，创建容器时按剩余资源选择节点"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.nodes = {}
+        self.default = None
+
+    def configure(self, spec, host_ip, port_start, port_end):
+        """spec 形如 "name|base_url|host_ip,..."，为空时只使用本机的 Docker"""
+        nodes = []
+        for item in (spec or '').split(','):
+            if not item.strip():
+                continue
+            parts = [p.strip() for p in item.split('|')]
+            name = parts[0]
+            base_url = parts[1] if len(parts) > 1 and parts[1] else None
+            node_ip = parts[2] if len(parts) > 2 and parts[2] else host_ip
+            nodes.append(Node(name, base_url, node_ip))
+        if not nodes:
+            nodes.append(Node(DEFAULT_NODE, None, host_ip))
+        for node in nodes:
+            node.ports.configure(port_start, port_end)
+        self.nodes = {n.name: n for n in nodes}
+        self.default = nodes[0]
+
+    def get(self, name):
+        """按名称取节点，旧数据没有节点或节点已从配置中移除时归到默认节点"""
+        return self.nodes.get(name) or self.default
+
+    def client(self, name):
+        return self.get(name).client
+
+    def all(self):
+        return list(self.nodes.values())
+
+    def owns(self, node):
+        """容器表中属于 node 的过滤条件"""
+        if node is not self.default:
+            return Container.node == node.name
+        others = [n for n in self.nodes if n != node.name]
+        return db.or_(Container.node.is_(None), Container.node.notin_(others) if others else db.true())
+
+    def release_port(self, name, port):
+        self.get(name).ports.release(port)
+
+    def seed_ports(self):
+        rows = db.session.query(Container.node, Container.host_port).filter(Container.status != 'removed').all()
+        by_node = {}
+        for name, port in rows:
+            by_node.setdefault(self.get(name).name, []).append(port)
+        for name, ports in by_node.items():
+            self.nodes[name].ports.seed(ports)
+
+    def refresh(self):
+        """更新各节点的容量和已分配资源"""
+        usage = {}
+        rows = db.session.query(Container.node, Template)\
+            .join(Template, Container.template_id == Template.id)\
+            .filter(Container.status != 'removed').all()
+        for name, template in rows:
+            cpu, mem = template_resources(template)
+            item = usage.setdefault(self.get(name).name, [0.0, 0, 0])
+            item[0] += cpu
+            item[1] += mem
+            item[2] += 1
+
+        for node in self.all():
+            try:
+                info = node.client.info()
+                healthy, error = True, None
+            except Exception as e:
+                info, healthy, error = None, False, str(e)
+            cpu, mem, count = usage.get(node.name, (0.0, 0, 0))
+            with self.lock:
+                if info:
+                    node.ncpu = info.get('NCPU', 0)
+                    node.mem_total = info.get('MemTotal', 0)
+                node.healthy = healthy
+                node.last_error = error
+                node.cpu_reserved = cpu
+                node.mem_reserved = mem
+                node.containers = count
+
+    def place(self, template):
+        """选择剩余资源最多、还有空闲端口的节点，并预先记下这次占用"""
+        cpu, mem = template_resources(template)
+        with self.lock:
+            candidates = [
+                n for n in self.nodes.values()
+                if n.healthy and n.ports.free > 0
+                and (not n.mem_total or n.mem_reserved + mem <= n.mem_total)
+            ]
+            if not candidates:
+                raise Exception('没有可用的 Docker 节点')
+            node = max(candidates, key=lambda n: (n.score(cpu, mem), -n.containers))
+            # 下次 refresh 前先按估算值累加，避免连续创建都落到同一个节点
+            node.cpu_reserved += cpu
+            node.mem_reserved += mem
+            node.containers += 1
+            return node
+
+    def snapshot(self):
+        with self.lock:
+            return [n.to_dict() for n in self.nodes.values()]
+
+    def run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Node refresh failed: {e}")
+            finally:
+                db.session.remove()
+            time.sleep(REFRESH_INTERVAL)
+
+node_registry = NodeRegistry()
+
+def init_nodes(app):
+    node_registry.configure(
+        app.config['DOCKER_NODES'], app.config['HOST_IP'],
+        app.config['PORT_RANGE_START'], app.config['PORT_RANGE_END']
+    )
+    with app.app_context():
+        node_registry.seed_ports()
+        node_registry.refresh()
+    threading.Thread(target=lambda: nodes_with_app(app), daemon=True).start()
+
+def nodes_with_app(app):
+    with app.app_context():
+        node_registry.run()
@@ -0,0 +1,51 @@
+import threading
+import time
+from collections import OrderedDict
+
+COUNT_TTL = 60
+# 缓存的 key 包含自由输入的过滤条件，限制条目数
+COUNT_CACHE_SIZE = 1024
+
+# key -> (总数, 过期时间)，按写入顺序排列
+_count_cache = OrderedDict()
+_count_lock = threading.Lock()
+
+def cached_count(key, query, ttl=COUNT_TTL):
+    """总数只用于展示，按 key 缓存 ttl 秒，避免每次翻页都 COUNT 整张表"""
+    now = time.time()
+    with _count_lock:
+        hit = _count_cache.get(key)
+        if hit and now < hit[1]:
+            return hit[0]
+    total = query.order_by(None).count()
+    with _count_lock:
+        _count_cache.pop(key, None)
+        _count_cache[key] = (total, now + ttl)
+        # 清理已过期的最早条目，再按容量淘汰
+        while _count_cache and next(iter(_count_cache.values()))[1] <= now:
+            _count_cache.popitem(last=False)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+    return total
+
+def keyset_paginate(query, column, per_page, before=None, after=None):
+    """按 column 倒序的游标分页：before 取更旧的一页，after 取更新的一页"""
+    if after is not None:
+        rows = query.filter(column > after).order_by(column.asc()).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = True
+    else:
+        if before is not None:
+            query = query.filter(column < before)
+        rows = query.order_by(column.desc()).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = before is not None
+    return {
+        'items': rows,
+        'has_prev': has_prev and bool(rows),
+        'has_next': has_next and bool(rows),
+        'prev_cursor': getattr(rows[0], column.key) if rows else None,
+        'next_cursor': getattr(rows[-1], column.key) if rows else None,
+    }
@@ -0,0 +1,86 @@
+# ports.py
+import random
+import socket
+import threading
+
+class PortAllocator:
+    """用位图记录 [start, end] 范围内主机端口的占用情况，next-fit 方式分配"""
+
+    def __init__(self, check_bind=True):
+        # 只有 Docker 跑在本机时才能用 bind 探测端口是否被占用
+        self.check_bind = check_bind
+        self.lock = threading.Lock()
+        self.start = 0
+        self.size = 0
+        self.bitmap = bytearray()
+        self.cursor = 0
+        self.free = 0
+
+    def configure(self, start, end):
+        with self.lock:
+            self.start = start
+            self.size = end - start + 1
+            self.bitmap = bytearray((self.size + 7) // 8)
+            self.free = self.size
+            # 每个进程从随机位置开始，多个 worker 之间不容易撞到同一个端口
+            self.cursor = random.randrange(self.size)
+
+    def _test(self, i):
+        return self.bitmap[i >> 3] & (1 << (i & 7))
+
+    def _set(self, i):
+        if not self._test(i):
+            self.bitmap[i >> 3] |= 1 << (i & 7)
+            self.free -= 1
+
+    def _clear(self, i):
+        if self._test(i):
+            self.bitmap[i >> 3] &= ~(1 << (i & 7)) & 0xff
+            self.free += 1
+
+    def seed(self, ports):
+        """按已被容器占用的端口初始化位图"""
+        with self.lock:
+            for port in ports:
+                self.mark_used(port, locked=True)
+
+    def mark_used(self, port, locked=False):
+        if port is None or not 0 <= port - self.start < self.size:
+            return
+        if locked:
+            self._set(port - self.start)
+        else:
+            with self.lock:
+                self._set(port - self.start)
+
+    def release(self, port):
+        if port is None or not 0 <= port - self.start < self.size:
+            return
+        with self.lock:
+            self._clear(port - self.start)
+
+    @staticmethod
+    def bindable(port):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                s.bind(('0.0.0.0', port))
+                return True
+            except OSError:
+                return False
+
+    def allocate(self):
+        """分配一个空闲且当前可以绑定的端口，范围用尽时抛出异常"""
+        while True:
+            with self.lock:
+                if self.free == 0:
+                    raise Exception('没有可用的主机端口')
+                i = self.cursor
+                while self._test(i):
+                    i = (i + 1) % self.size
+                self._set(i)
+                self.cursor = (i + 1) % self.size
+            port = self.start + i
+            if not self.check_bind or self.bindable(port):
+                return port
+            # 已被其他进程或程序占用，保持标记并继续找下一个
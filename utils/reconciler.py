@@ -0,0 +1,116 @@
+# reconciler.py
+import threading
+import time
+import docker
+from flask import current_app
+from models import db
+from models.container import Container
+from utils.docker import MANAGED_LABEL
+from utils.nodes import node_registry
+from utils.logger import log_action
+from utils.stats import stats_cache
+from utils.metrics import metrics_store
+from utils.counters import dashboard_counters
+from utils.removal import mark_removed
+
+RECONNECT_DELAY = 5
+
+# Docker 事件 -> containers.status
+EVENT_STATUS = {
+    'start': 'running',
+    'unpause': 'running',
+    'restart': 'running',
+    'pause': 'paused',
+    'die': 'exited',
+    'stop': 'exited',
+    'destroy': 'removed',
+}
+
+def track_history(docker_id, status, node):
+    if status == 'removed':
+        metrics_store.drop(docker_id)
+    elif status == 'running' and current_app.config['STATS_HISTORY']:
+        stats_cache.watch(docker_id, node)
+
+def apply_status(docker_id, status):
+    cont = Container.query.filter_by(docker_id=docker_id).filter(Container.status != 'removed').first()
+    if not cont:
+        if status == 'removed':
+            metrics_store.drop(docker_id)
+        return
+    track_history(docker_id, status, cont.node)
+    if cont.status == status:
+        return
+    if status == 'removed':
+        if mark_removed(cont):
+            log_action(f'Delete non-existent container {docker_id}', 'system')
+        return
+    old_status = cont.status
+    cont.status = status
+    db.session.commit()
+    dashboard_counters.status_changed(old_status, status)
+
+def resync(node):
+    """全量同步一个节点：一次 list 调用取回该节点所有受管容器的状态"""
+    docker_status = {
+        c.id: c.status
+        for c in node.client.containers.list(all=True, filters={'label': MANAGED_LABEL})
+    }
+    for cont in Container.query.filter(Container.status != 'removed', node_registry.owns(node)).all():
+        status = docker_status.get(cont.docker_id)
+        if status is None:
+            # 没有标签的旧容器不会出现在列表里，单独确认一次
+            try:
+                status = node.client.containers.get(cont.docker_id).status
+            except docker.errors.NotFound:
+                status = 'removed'
+        track_history(cont.docker_id, status, node.name)
+        if cont.status == status:
+            continue
+        if status == 'removed':
+            if mark_removed(cont):
+                log_action(f'Delete non-existent container {cont.docker_id}', 'system')
+            continue
+        old_status = cont.status
+        cont.status = status
+        db.session.commit()
+        dashboard_counters.status_changed(old_status, status)
+
+def watch_events(node):
+    print(f"Starting container reconciler thread for node {node.name}...")
+    while True:
+        try:
+            # 先记下时间点再全量同步，同步期间产生的事件会被重放，处理是幂等的
+            since = int(time.time())
+            resync(node)
+            db.session.remove()
+            events = node.client.events(
+                since=since,
+                decode=True,
+                filters={'type': 'container', 'label': MANAGED_LABEL}
+            )
+            for event in events:
+                status = EVENT_STATUS.get(event.get('Action') or event.get('status'))
+                if status is None:
+                    continue
+                try:
+                    apply_status(event['Actor']['ID'], status)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Reconciler failed to apply event {event}: {e}")
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            print(f"Docker event stream of node {node.name} lost: {e}")
+        finally:
+            db.session.remove()
+        time.sleep(RECONNECT_DELAY)
+
+def start_reconciler_thread(app):
+    # 每个节点一条事件流
+    for node in node_registry.all():
+        threading.Thread(target=lambda node=node: reconciler_with_app(app, node), daemon=True).start()
+
+def reconciler_with_app(app, node):
+    with app.app_context():
+        watch_events(node)
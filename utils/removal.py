@@ -0,0 +1,29 @@
+# removal.py
+from models import db
+from models.container import Container
+from models.quota import Quota
+from utils.nodes import node_registry
+from utils.counters import dashboard_counters
+
+def mark_removed(cont):
+    """把容器标记为 removed，并释放配额、端口和首页计数。
+
+    用带条件的 UPDATE 完成状态切换，多个线程 / 进程同时删除同一个容器时只有一方的 rowcount 为 1，
+    只有这一方释放资源并返回 True。
+    """
+    old_status, user_id, node, host_port = cont.status, cont.user_id, cont.node, cont.host_port
+    try:
+        rowcount = Container.query\
+            .filter(Container.id == cont.id, Container.status != 'removed')\
+            .update({'status': 'removed'}, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire(cont)
+    if rowcount != 1:
+        return False
+    dashboard_counters.status_changed(old_status, 'removed')
+    Quota.release(user_id)
+    node_registry.release_port(node, host_port)
+    return True
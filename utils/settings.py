@@ -1,11 +1,60 @@
+import threading
+import time
 from models.settings import SystemSettings
 
-def get_setting(key, default=None, type_cast=str):
-    try:
-        setting = SystemSettings.get_by_key(key)
-        if setting:
-            return type_cast(setting.value)
-        else:
+# 其他 worker 进程修改的设置最多延迟这么久生效
+SETTINGS_TTL = 30
+
+class SettingsCache:
+    """一次性读出 system_settings 全部行，按 TTL 整体刷新，本进程修改时立即失效"""
+
+    def __init__(self, ttl=SETTINGS_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.values = None
+        # (key, type_cast) -> 转换后的值
+        self.typed = {}
+        self.loaded_at = 0
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded_at = 0
+
+    def _load(self):
+        with self.lock:
+            if self.values is not None and time.time() - self.loaded_at < self.ttl:
+                return
+            try:
+                values = {s.key: s.value for s in SystemSettings.query.all()}
+            except Exception as e:
+                if self.values is None:
+                    raise
+                # 数据库暂时不可用时继续使用旧值，稍后再试
+                print(f"Failed to reload settings: {e}")
+                self.loaded_at = time.time()
+                return
+            self.values = values
+            self.typed = {}
+            self.loaded_at = time.time()
+
+    def get(self, key, default=None, type_cast=str):
+        if self.values is None or time.time() - self.loaded_at >= self.ttl:
+            self._load()
+        typed = self.typed
+        cache_key = (key, type_cast)
+        if cache_key in typed:
+            return typed[cache_key]
+        value = self.values.get(key)
+        if value is None:
+            return default
+        try:
+            value = type_cast(value)
+        except (ValueError, TypeError):
             return default
-    except (ValueError, TypeError):
-        return default
\ No newline at end of file
+        typed[cache_key] = value
+        return value
+
+settings_cache = SettingsCache()
+
+def get_setting(key, default=None, type_cast=str):
+    return settings_cache.get(key, default, type_cast)
@@ -0,0 +1,119 @@
+# stats.py
+import threading
+import time
+from utils.docker import get_client
+from utils.metrics import metrics_store, MAX_TRACKED
+
+# 超过该时间没有人查看就关闭采样
+IDLE_TIMEOUT = 60
+FIRST_SAMPLE_TIMEOUT = 3
+
+def compute_stats(stats):
+    cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - stats['precpu_stats'].get('cpu_usage', {}).get('total_usage', 0)
+    system_cpu_delta = stats['cpu_stats'].get('system_cpu_usage', 0) - stats['precpu_stats'].get('system_cpu_usage', 0)
+    cpu_count = stats['cpu_stats'].get('online_cpus') or len(stats['cpu_stats']['cpu_usage'].get('percpu_usage', []))
+    cpu_percent = (cpu_delta / system_cpu_delta) * cpu_count * 100.0 if system_cpu_delta > 0 else 0.0
+    mem_usage = stats['memory_stats'].get('usage', 0)
+    mem_limit = stats['memory_stats'].get('limit', 0)
+    mem_percent = (mem_usage / mem_limit) * 100.0 if mem_limit > 0 else 0.0
+    networks = (stats.get('networks') or {}).values()
+    blkio = {'read': 0, 'write': 0}
+    for item in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+        op = item.get('op', '').lower()
+        if op in blkio:
+            blkio[op] += item.get('value', 0)
+    return {
+        'cpu_percent': round(cpu_percent, 2),
+        'mem_usage': mem_usage,
+        'mem_limit': mem_limit,
+        'mem_percent': round(mem_percent, 2),
+        'net_rx': sum(n.get('rx_bytes', 0) for n in networks),
+        'net_tx': sum(n.get('tx_bytes', 0) for n in networks),
+        'blk_read': blkio['read'],
+        'blk_write': blkio['write']
+    }
+
+class StatsSampler:
+    """持有一条 stats 流式连接，把最新的计算结果保存在内存中并写入历史"""
+
+    def __init__(self, docker_id, node, on_exit, persistent=False):
+        self.docker_id = docker_id
+        self.node = node
+        self.on_exit = on_exit
+        # persistent 的采样器用于记录历史，不会因为无人查看而退出
+        self.persistent = persistent
+        self.latest = None
+        self.ready = threading.Event()
+        self.last_access = time.time()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        stream = None
+        try:
+            stream = get_client(self.node).api.stats(self.docker_id, stream=True, decode=True)
+            history = metrics_store.get(self.docker_id, create=True)
+            for raw in stream:
+                now = time.time()
+                self.latest = compute_stats(raw)
+                self.latest['timestamp'] = now
+                if history is None and self.persistent:
+                    history = metrics_store.get(self.docker_id, create=True)
+                if history is not None:
+                    if metrics_store.get(self.docker_id) is history:
+                        history.record(now, self.latest)
+                    else:
+                        # 历史已被 MetricsStore 淘汰或删除，不再写入，常驻采样器退回为按需采样
+                        history = None
+                        self.persistent = False
+                self.ready.set()
+                if not self.persistent and now - self.last_access > IDLE_TIMEOUT:
+                    break
+        except Exception as e:
+            print(f"Stats sampler for {self.docker_id} stopped: {e}")
+        finally:
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+            self.on_exit(self)
+            self.ready.set()
+
+class StatsCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samplers = {}
+
+    def _on_exit(self, sampler):
+        with self.lock:
+            if self.samplers.get(sampler.docker_id) is sampler:
+                del self.samplers[sampler.docker_id]
+
+    def watch(self, docker_id, node):
+        """为容器启动常驻采样器，用于持续记录历史数据，常驻采样器最多 MAX_TRACKED 个"""
+        with self.lock:
+            sampler = self.samplers.get(docker_id)
+            if sampler is not None and sampler.persistent:
+                return
+            if sum(1 for s in self.samplers.values() if s.persistent) >= MAX_TRACKED:
+                return
+            if sampler is not None:
+                sampler.persistent = True
+                return
+            sampler = StatsSampler(docker_id, node, self._on_exit, persistent=True)
+            self.samplers[docker_id] = sampler
+            sampler.start()
+
+    def get(self, docker_id, node, timeout=FIRST_SAMPLE_TIMEOUT):
+        """返回最近一次采样结果，第一次访问时启动采样并等待首个样本"""
+        with self.lock:
+            sampler = self.samplers.get(docker_id)
+            if sampler is None:
+                sampler = StatsSampler(docker_id, node, self._on_exit)
+                self.samplers[docker_id] = sampler
+                sampler.start()
+        sampler.last_access = time.time()
+        if sampler.latest is None:
+            sampler.ready.wait(timeout)
+        return sampler.latest
+
+stats_cache = StatsCache()
@@ -0,0 +1,244 @@
+# warm_pool.py
+import threading
+import time
+import random
+import docker
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError
+from models import db
+from models.template import Template
+from models.container import Container
+from models.image import Image
+from models.pool import PoolContainer
+from utils.docker import run_with_port, remove_quietly
+from utils.nodes import node_registry
+
+POOL_LABEL = 'docker-run.pool'
+REFILL_INTERVAL = 30
+# 创建后这么久仍未登记或未运行的池容器才视为遗留
+ADOPT_GRACE = timedelta(minutes=1)
+
+class WarmPool:
+    """按模板维护预先创建好的空闲容器，create() 时直接取用，后台线程负责补充。
+
+    空闲容器记录在 pool_containers 表中，所有 worker 进程共用一个池：
+    取用和回收都先认领记录（见 PoolContainer），池的大小也按表中的数量计算。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # 命中率等统计只记录本进程的情况
+        self.stats = {}
+        self.refill_event = threading.Event()
+
+    def _stats(self, template_id):
+        return self.stats.setdefault(template_id, {
+            'hits': 0,
+            'misses': 0,
+            'refills': 0,
+            'refill_failures': 0,
+            'refill_time_total': 0.0,
+            'refill_time_last': 0.0,
+        })
+
+    def acquire(self, template, name):
+        """认领一个预热容器并重命名为 name，没有可用容器时返回 None"""
+        while True:
+            row = PoolContainer.claim(template.id)
+            if template.pool_size:
+                self.refill_event.set()
+            if row is None:
+                with self.lock:
+                    self._stats(template.id)['misses'] += 1
+                return None
+
+            entry = row.entry()
+            try:
+                docker_cont = node_registry.client(entry['node']).containers.get(entry['docker_id'])
+            except docker.errors.NotFound:
+                node_registry.release_port(entry['node'], entry['host_port'])
+                self._forget(row)
+                continue
+            if docker_cont.status != 'running':
+                self._remove(row)
+                continue
+
+            try:
+                docker_cont.rename(name)
+            except Exception:
+                # 重命名失败（例如名称冲突），放回池中
+                row.unclaim()
+                raise
+            # 容器已交给调用方，不再属于池
+            self._forget(row)
+
+            with self.lock:
+                self._stats(template.id)['hits'] += 1
+            return entry
+
+    def snapshot(self):
+        idle = PoolContainer.idle_counts()
+        with self.lock:
+            result = {}
+            for template_id in set(idle) | set(self.stats):
+                stats = dict(self._stats(template_id))
+                stats['idle'] = idle.get(template_id, 0)
+                total = stats['hits'] + stats['misses']
+                stats['hit_rate'] = round(stats['hits'] / total, 4) if total else 0.0
+                stats['refill_time_avg'] = round(stats['refill_time_total'] / stats['refills'], 3) if stats['refills'] else 0.0
+                result[template_id] = stats
+            return result
+
+    def _forget(self, row):
+        db.session.delete(row)
+        db.session.commit()
+
+    def _remove(self, row):
+        """删除已认领的容器；删除失败时保留记录，超时后重新变为空闲再处理"""
+        entry = row.entry()
+        try:
+            node_registry.client(entry['node']).containers.get(entry['docker_id']).remove(force=True)
+        except docker.errors.NotFound:
+            pass
+        except Exception as e:
+            print(f"Warm pool failed to remove {entry['docker_id']}: {e}")
+            return
+        node_registry.release_port(entry['node'], entry['host_port'])
+        self._forget(row)
+
+    def _spawn(self, template):
+        start = time.time()
+        try:
+            docker_cont, host_port, node = run_with_port(
+                template,
+                f"pool_{template.id}_{random.randint(100000, 999999)}",
+                labels={POOL_LABEL: str(template.id)}
+            )
+        except Exception as e:
+            print(f"Warm pool refill for template {template.id} failed: {e}")
+            with self.lock:
+                self._stats(template.id)['refill_failures'] += 1
+            return False
+
+        try:
+            db.session.add(PoolContainer(
+                docker_id=docker_cont.id, template_id=template.id, node=node, host_port=host_port
+            ))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warm pool failed to record {docker_cont.id}: {e}")
+            remove_quietly(docker_cont)
+            node_registry.release_port(node, host_port)
+            with self.lock:
+                self._stats(template.id)['refill_failures'] += 1
+            return False
+
+        elapsed = time.time() - start
+        with self.lock:
+            stats = self._stats(template.id)
+            stats['refills'] += 1
+            stats['refill_time_total'] += elapsed
+            stats['refill_time_last'] = round(elapsed, 3)
+        return True
+
+    def adopt_existing(self):
+        """把带池标签、但既不属于用户也没有池记录的容器登记为空闲，例如上次运行遗留的容器。
+        同时清理容器已不存在的池记录。多出的容器由 refill_once 回收"""
+        for node in node_registry.all():
+            listed_at = datetime.now()
+            docker_conts = node.client.containers.list(all=True, filters={'label': POOL_LABEL})
+            ids = [d.id for d in docker_conts]
+            owned = set(
+                docker_id for (docker_id,) in
+                db.session.query(Container.docker_id).filter(Container.docker_id.in_(ids))
+            ) if ids else set()
+            pooled = {row.docker_id: row for row in PoolContainer.query.filter(PoolContainer.node == node.name)}
+
+            for docker_cont in docker_conts:
+                host_port = None
+                for bindings in (docker_cont.attrs['HostConfig'].get('PortBindings') or {}).values():
+                    if bindings:
+                        host_port = int(bindings[0]['HostPort'])
+                        break
+                # 其他 worker 的池容器也占着端口
+                node.ports.mark_used(host_port)
+                if docker_cont.id in owned or docker_cont.id in pooled:
+                    continue
+                if docker_cont.status != 'running' or not host_port:
+                    # 刚创建、还在启动中的容器可能属于其他 worker 正在进行的补充
+                    created = docker_cont.attrs.get('Created', '')[:19]
+                    try:
+                        stale = datetime.fromisoformat(created) < datetime.now(timezone.utc).replace(tzinfo=None) - ADOPT_GRACE
+                    except ValueError:
+                        stale = False
+                    if stale:
+                        remove_quietly(docker_cont)
+                        node.ports.release(host_port)
+                    continue
+                try:
+                    db.session.add(PoolContainer(
+                        docker_id=docker_cont.id,
+                        template_id=int(docker_cont.labels.get(POOL_LABEL, 0)),
+                        node=node.name,
+                        host_port=host_port
+                    ))
+                    db.session.commit()
+                except IntegrityError:
+                    # 其他 worker 已经登记
+                    db.session.rollback()
+
+            present = set(ids)
+            for docker_id, row in pooled.items():
+                if docker_id not in present and row.created_at < listed_at - ADOPT_GRACE:
+                    db.session.delete(row)
+            db.session.commit()
+
+    def refill_once(self):
+        templates = Template.query.all()
+        sizes = {t.id: (t.pool_size or 0) for t in templates}
+        PoolContainer.reclaim_stale()
+        idle = PoolContainer.idle_counts()
+
+        # 模板被删除、池变小或多个 worker 同时补充时回收多余的容器
+        for template_id, count in idle.items():
+            keep = sizes.get(template_id, 0)
+            if count > keep:
+                for row in PoolContainer.claim_surplus(template_id, keep):
+                    self._remove(row)
+
+        for template in templates:
+            # 镜像未就绪时 containers.run 会阻塞在拉取上，等镜像管理线程拉完再补充
+            if sizes[template.id] and not Image.is_ready(template.image):
+                continue
+            missing = sizes[template.id] - idle.get(template.id, 0)
+            for _ in range(missing):
+                if not self._spawn(template):
+                    break
+
+    def run(self):
+        print("Starting warm pool thread...")
+        try:
+            self.adopt_existing()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warm pool adopt failed: {e}")
+        while True:
+            try:
+                self.refill_once()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Warm pool refill failed: {e}")
+            finally:
+                db.session.remove()
+            self.refill_event.wait(REFILL_INTERVAL)
+            self.refill_event.clear()
+
+warm_pool = WarmPool()
+
+def start_warm_pool_thread(app):
+    threading.Thread(target=lambda: warm_pool_with_app(app), daemon=True).start()
+
+def warm_pool_with_app(app):
+    with app.app_context():
+        warm_pool.run()